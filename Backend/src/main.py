@@ -1,11 +1,13 @@
 # src/main.py
 # Ensure you have at the top
-from io import BytesIO
+import io
+import csv
+import itertools
 import sys
 from werkzeug.exceptions import HTTPException
 import pytz
 from unittest import skip
-from flask import Flask, json, jsonify, request, abort, send_file
+from flask import Flask, Response, json, jsonify, request, abort, send_file, stream_with_context
 from flask_pymongo import DESCENDING, PyMongo, ASCENDING
 from flask_cors import CORS
 from flask_limiter import Limiter
@@ -16,15 +18,30 @@ from flask_jwt_extended import (
 )
 from cryptography.fernet import Fernet
 from functools import wraps
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from collections import Counter, OrderedDict, defaultdict
+import bisect
+import threading
+import time
+import tempfile
+import shutil
+import click
 import bcrypt
 import re
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+from urllib.parse import urlencode
 import os
 import bleach
-from pymongo.errors import PyMongoError
+import base64
+import hashlib
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
 from bson import ObjectId
 import logging
+from bson import json_util
 from bson.json_util import dumps
 from gridfs import GridFS
 from werkzeug.utils import secure_filename
@@ -102,6 +119,9 @@ def handle_revoked_token(jwt_header, jwt_payload):
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif','webp'}
 MAX_RESTAURANT_IMAGES = 5
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+# Multipart framing plus the small form fields sent with the file
+MAX_UPLOAD_OVERHEAD = 64 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
 
 def allowed_file(filename):
     return '.' in filename and \
@@ -124,36 +144,85 @@ with app.app_context():
            
         # Users
         mongo.db.users.create_index([("email", ASCENDING)], unique=True)
-        mongo.db.users.create_index([("saved_restaurants", ASCENDING)])
+
+        # Saved restaurants
+        mongo.db.saved_restaurants.create_index(
+            [("user_id", ASCENDING), ("restaurant_id", ASCENDING)], unique=True
+        )
+        mongo.db.saved_restaurants.create_index(
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]
+        )
+        mongo.db.saved_restaurants.create_index([("restaurant_id", ASCENDING)])
         
         mongo.db.role_upgrade_requests.create_index([("user_id", ASCENDING), ("status", ASCENDING)])
 
         # Restaurants - Fixed index creation
-        try:
-            # Remove existing text index if it exists
-            mongo.db.restaurants.drop_index("name_text")
-            app.logger.info("Dropped legacy name_text index")
-        except Exception as e:
-            app.logger.debug(f"No existing name_text index: {str(e)}")
+        for legacy_index in ("name_text", "status_cuisine_name_text"):
+            try:
+                # Remove superseded text indexes if they exist
+                mongo.db.restaurants.drop_index(legacy_index)
+                app.logger.info(f"Dropped legacy {legacy_index} index")
+            except Exception as e:
+                app.logger.debug(f"No existing {legacy_index} index: {str(e)}")
         
-        # Create new compound index
+        # $text needs equality on every key before the text key, so only
+        # status stays a prefix; cuisine is a suffix that still filters in-index
         mongo.db.restaurants.create_index([
             ("status", ASCENDING),
-            ("cuisine", ASCENDING),
-            ("name", "text")
-        ], name="status_cuisine_name_text")
+            ("name", "text"),
+            ("cuisine", ASCENDING)
+        ], name="status_name_text_cuisine")
+        
+        mongo.db.restaurants.create_index([
+            ("location", "2dsphere"),
+            ("status", ASCENDING),
+            ("cuisine", ASCENDING)
+        ])
+        mongo.db.restaurants.create_index(
+            [("status", ASCENDING), ("city", ASCENDING), ("cuisine", ASCENDING)],
+            collation={"locale": "en", "strength": 2}
+        )
+        mongo.db.restaurants.create_index([
+            ("status", ASCENDING), ("rating_avg", DESCENDING), ("_id", DESCENDING)
+        ])
+        mongo.db.restaurants.create_index([
+            ("status", ASCENDING), ("save_count", DESCENDING), ("_id", DESCENDING)
+        ])
         
         # Reservations
         mongo.db.reservations.create_index([("user_id", ASCENDING)])
         mongo.db.reservations.create_index([("restaurant_id", ASCENDING)])
         mongo.db.reservations.create_index([("datetime", ASCENDING)])
+        mongo.db.reservations.create_index([("restaurant_id", ASCENDING), ("datetime", ASCENDING)])
+        mongo.db.reservations.create_index([("owner_id", ASCENDING), ("datetime", ASCENDING), ("_id", ASCENDING)])
+
+        # Owner analytics rollups
+        mongo.db.reservation_rollups.create_index(
+            [("restaurant_id", ASCENDING), ("granularity", ASCENDING), ("period_start", ASCENDING)],
+            unique=True
+        )
+
+        # Slot occupancy counters
+        mongo.db.slot_occupancy.create_index(
+            [("restaurant_id", ASCENDING), ("slot_start", ASCENDING)],
+            unique=True
+        )
         
         # Menu Items
         mongo.db.menu_items.create_index([("restaurant_id", ASCENDING)])
         mongo.db.menu_items.create_index([("name", "text")])
+        mongo.db.menu_items.create_index([("restaurant_id", ASCENDING), ("category", ASCENDING), ("_id", ASCENDING)])
+        mongo.db.fs.files.create_index([("metadata.derivative_of", ASCENDING)], sparse=True)
+        mongo.db.menu_snapshot_history.create_index(
+            [("restaurant_id", ASCENDING), ("version", DESCENDING)], unique=True
+        )
         
         mongo.db.reservations.create_index([("datetime", ASCENDING)])
         mongo.db.reviews.create_index([("created_at", DESCENDING)])
+        mongo.db.reviews.create_index([("restaurant_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)])
+        mongo.db.restaurants.create_index([("owner_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)])
+        mongo.db.restaurants.create_index([("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)])
+        mongo.db.restaurants.create_index([("status", ASCENDING), ("_id", ASCENDING)])
         mongo.db.role_upgrade_requests.create_index([("created_at", DESCENDING)])
 
         # Reviews
@@ -173,6 +242,21 @@ with app.app_context():
     except PyMongoError as e:
         app.logger.error(f"Main index error: {str(e)}")
 
+    try:
+        # One item per name within a restaurant; bulk imports upsert on this key
+        try:
+            mongo.db.menu_items.drop_index("restaurant_id_1_name_1")
+            app.logger.info("Dropped legacy non-unique restaurant_id_1_name_1 index")
+        except Exception as e:
+            app.logger.debug(f"No existing restaurant_id_1_name_1 index: {str(e)}")
+        mongo.db.menu_items.create_index(
+            [("restaurant_id", ASCENDING), ("name", ASCENDING)],
+            unique=True, name="restaurant_id_name_unique"
+        )
+    except PyMongoError as e:
+        # Fails while duplicate names remain; rename or delete them and restart
+        app.logger.error(f"Menu item name index error: {str(e)}")
+
     try:
         mongo.db.audit_logs.create_index([("admin_id", ASCENDING)])
         mongo.db.audit_logs.create_index([("timestamp", ASCENDING)], expireAfterSeconds=86400*30)  # 30 days retention
@@ -204,28 +288,231 @@ def log_role_change(admin_id, user_id, old_role, new_role):
         "new_role": new_role,
         "timestamp": datetime.now(timezone.utc)
     }) 
-def compress_image(image_data):
-    """Compress image using Pillow"""
+def compress_image(source_path, output_path):
+    """Compress an image file using Pillow; runs in the image process pool.
+
+    Returns the content type of the encoded output.
+    """
     from PIL import Image
-    from io import BytesIO
-    
-    img = Image.open(BytesIO(image_data))
-    
-    # Convert to RGB for JPEG compatibility
-    if img.mode in ('RGBA', 'P'):
-        img = img.convert('RGB')
-    
-    # Resize and compress
-    img.thumbnail((1024, 1024))  # Maintain aspect ratio
-    output = BytesIO()
-    
-    # WEBP handling
-    if img.format == 'WEBP':
-        img.save(output, format='WEBP', quality=85)
-    else:
-        img.save(output, format='JPEG', quality=85, optimize=True)
-    
-    return output.getvalue()
+
+    with Image.open(source_path) as img:
+        source_format = img.format
+        # Convert to RGB for JPEG compatibility
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+
+        # Resize and compress
+        img.thumbnail((1024, 1024))  # Maintain aspect ratio
+
+        # WEBP handling
+        if source_format == 'WEBP':
+            img.save(output_path, format='WEBP', quality=85)
+            return 'image/webp'
+        img.save(output_path, format='JPEG', quality=85, optimize=True)
+        return 'image/jpeg'
+
+# Downscaled copies served to clients that ask for a smaller width (?w=)
+IMAGE_DERIVATIVE_WIDTHS = [int(width) for width in os.getenv("IMAGE_DERIVATIVE_WIDTHS", "160,480,1024").split(",")]
+IMAGE_DERIVATIVE_FORMATS = [fmt.strip().upper() for fmt in os.getenv("IMAGE_DERIVATIVE_FORMATS", "WEBP,JPEG").split(",")]
+IMAGE_FORMAT_CONTENT_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg"}
+
+def render_image_derivatives(source_path, output_prefix, widths, formats):
+    """Encode a downscaled copy per width and format; runs in the image process pool.
+
+    Widths at or above the source width are skipped. Returns
+    (path, width, content_type) tuples.
+    """
+    from PIL import Image
+
+    derivatives = []
+    with Image.open(source_path) as img:
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        for width in sorted(widths):
+            if width >= img.width:
+                break
+            resized = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+            for fmt in formats:
+                path = f"{output_prefix}.{width}.{fmt.lower()}"
+                resized.save(path, format=fmt, quality=80)
+                derivatives.append((path, width, IMAGE_FORMAT_CONTENT_TYPES[fmt]))
+    return derivatives
+
+def process_image_upload(source_path, work_dir):
+    """Compressed original plus its derivatives for a fresh upload"""
+    output_path = os.path.join(work_dir, "output")
+    content_type = compress_image(source_path, output_path)
+    derivatives = render_image_derivatives(
+        source_path, os.path.join(work_dir, "derivative"), IMAGE_DERIVATIVE_WIDTHS, IMAGE_DERIVATIVE_FORMATS
+    )
+    return output_path, content_type, derivatives
+
+# Pillow work is CPU-bound, so it runs in worker processes rather than on
+# request threads. Jobs in flight are bounded; excess uploads get a 503.
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+MAX_PENDING_IMAGE_JOBS = IMAGE_WORKERS * 4
+IMAGE_JOB_TIMEOUT = 30
+image_pool = None
+image_pool_lock = threading.Lock()
+image_job_slots = threading.BoundedSemaphore(MAX_PENDING_IMAGE_JOBS)
+
+def get_image_pool():
+    """Process pool created on first use; None where fork is unavailable.
+
+    Forked workers inherit the loaded module instead of re-importing the app.
+    """
+    global image_pool
+    with image_pool_lock:
+        if image_pool is None and "fork" in multiprocessing.get_all_start_methods():
+            image_pool = ProcessPoolExecutor(
+                max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("fork")
+            )
+        return image_pool
+
+def run_image_job(fn, *args):
+    """Run fn(*args) in the image pool, waiting for a free slot.
+
+    Raises FutureTimeoutError if the job outlives IMAGE_JOB_TIMEOUT.
+    """
+    global image_pool
+    if not image_job_slots.acquire(timeout=IMAGE_JOB_TIMEOUT):
+        abort(503, "Image processing is busy, try again shortly")
+    future = None
+    try:
+        pool = get_image_pool()
+        if pool is None:
+            return fn(*args)
+        future = pool.submit(fn, *args)
+        # A timed-out job keeps its worker busy, so it keeps its slot until it ends
+        future.add_done_callback(lambda _: image_job_slots.release())
+        return future.result(timeout=IMAGE_JOB_TIMEOUT)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool next time
+        with image_pool_lock:
+            image_pool = None
+        raise
+    finally:
+        if future is None:
+            image_job_slots.release()
+
+def store_gridfs_file(path, **kwargs):
+    """Stream a file on disk into GridFS chunk by chunk, returning its id"""
+    grid_in = fs.new_file(**kwargs)
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(grid_in.chunk_size), b""):
+                grid_in.write(chunk)
+    except Exception:
+        grid_in.abort()
+        raise
+    grid_in.close()
+    return grid_in._id
+
+def store_image_derivatives(original_id, derivatives, metadata):
+    """Store rendered derivatives in GridFS and link them from the original's metadata"""
+    base_metadata = {key: value for key, value in metadata.items()
+                     if key not in ("derivatives", "derivatives_claimed_at")}
+    linked = []
+    for path, width, content_type in derivatives:
+        file_id = store_gridfs_file(
+            path,
+            filename=f"{original_id}_{width}w.{content_type.split('/')[1]}",
+            content_type=content_type,
+            metadata={**base_metadata, "derivative_of": original_id, "width": width}
+        )
+        linked.append({"file_id": file_id, "width": width, "content_type": content_type})
+
+    mongo.db.fs.files.update_one(
+        {"_id": original_id},
+        {"$set": {"metadata.derivatives": linked}, "$unset": {"metadata.derivatives_claimed_at": ""}}
+    )
+    return linked
+
+DERIVATIVE_CLAIM_TIMEOUT = timedelta(minutes=5)
+
+def generate_image_derivatives(original):
+    """Derivatives for an image uploaded before they existed.
+
+    Returns None when another backfill run is already generating them.
+    """
+    now = datetime.now(timezone.utc)
+    claimed = mongo.db.fs.files.update_one({
+        "_id": original["_id"],
+        "metadata.derivatives": {"$exists": False},
+        "$or": [
+            {"metadata.derivatives_claimed_at": {"$exists": False}},
+            {"metadata.derivatives_claimed_at": {"$lt": now - DERIVATIVE_CLAIM_TIMEOUT}}
+        ]
+    }, {"$set": {"metadata.derivatives_claimed_at": now}})
+    if not claimed.modified_count:
+        return None
+
+    work_dir = tempfile.mkdtemp(prefix="derivatives-")
+    try:
+        source_path = os.path.join(work_dir, "source")
+        grid_out = fs.get(original["_id"])
+        with open(source_path, "wb") as f:
+            for chunk in iter(grid_out.readchunk, b""):
+                f.write(chunk)
+        derivatives = run_image_job(
+            render_image_derivatives, source_path, os.path.join(work_dir, "derivative"),
+            IMAGE_DERIVATIVE_WIDTHS, IMAGE_DERIVATIVE_FORMATS
+        )
+        return store_image_derivatives(original["_id"], derivatives, original.get("metadata") or {})
+    except Exception:
+        mongo.db.fs.files.update_one(
+            {"_id": original["_id"]}, {"$unset": {"metadata.derivatives_claimed_at": ""}}
+        )
+        raise
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+@app.cli.command("generate-image-derivatives")
+@click.option("--limit", default=0, help="Stop after this many images (default: all)")
+def generate_missing_image_derivatives(limit):
+    """Backfill derivatives for images uploaded before they existed"""
+    generated = 0
+    legacy = mongo.db.fs.files.find({
+        "metadata.derivatives": {"$exists": False},
+        "metadata.derivative_of": {"$exists": False}
+    }, {"metadata": 1}).limit(limit)
+    for original in legacy:
+        try:
+            if generate_image_derivatives(original) is not None:
+                generated += 1
+        except Exception as e:
+            click.echo(f"Skipped {original['_id']}: {str(e)}")
+    click.echo(f"Generated derivatives for {generated} images")
+
+def select_image_variant(derivatives, width, accepts_webp):
+    """Smallest derivative at least `width` wide in an accepted format, or None"""
+    candidates = [
+        derivative for derivative in derivatives
+        if derivative["width"] >= width and (accepts_webp or derivative["content_type"] != "image/webp")
+    ]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda derivative: (derivative["width"], derivative["content_type"] != "image/webp"))
+
+def pick_image_variant(image_id, width):
+    """File id to serve for a ?w= request; the original until derivatives exist"""
+    original = mongo.db.fs.files.find_one({"_id": image_id}, {"metadata": 1})
+    if not original:
+        return image_id
+    # Legacy images are served as-is; `flask generate-image-derivatives` backfills them
+    derivatives = (original.get("metadata") or {}).get("derivatives")
+    if not derivatives:
+        return image_id
+
+    best = select_image_variant(derivatives, width, "image/webp" in request.headers.get("Accept", ""))
+    return best["file_id"] if best else image_id
+
+def delete_image(image_id):
+    """Delete a GridFS image together with its derivatives"""
+    for derivative in mongo.db.fs.files.find({"metadata.derivative_of": image_id}, {"_id": 1}):
+        fs.delete(derivative["_id"])
+    if fs.exists(image_id):
+        fs.delete(image_id)
 
 # ========================
 # Input Validation Enhancements (Add near existing helper functions)
@@ -260,6 +547,21 @@ def validate_datetime(dt_str):
     except ValueError:
         return False
 
+def parse_location(value):
+    """Normalize a GeoJSON Point or {"lat", "lng"} object; returns None if invalid"""
+    try:
+        if isinstance(value, dict) and value.get("type") == "Point":
+            lng, lat = (float(c) for c in value["coordinates"])
+        elif isinstance(value, dict):
+            lat, lng = float(value["lat"]), float(value["lng"])
+        else:
+            return None
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return {"type": "Point", "coordinates": [lng, lat]}
+
 def validate_email(email):
     return re.match(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$", email)
 
@@ -279,6 +581,9 @@ def sanitize_input(data: dict):
         "password": data.get("password", "").strip(),
     }
 
+# Case-insensitive equality matching that can still use an index
+CASE_INSENSITIVE_COLLATION = {"locale": "en", "strength": 2}
+
 def get_pagination_params():
     try:
         page = max(1, int(request.args.get('page', 1)))
@@ -287,6 +592,140 @@ def get_pagination_params():
     except ValueError:
         abort(400, "Invalid pagination parameters")
 
+# List endpoints return a compact summary shape unless ?fields= or ?view=full
+RESTAURANT_FIELDS = {
+    "name", "address", "city", "cuisine", "description", "opening_hours", "capacity",
+    "timezone", "images", "location", "price_range", "rating_avg", "rating_count",
+    "rating_histogram", "save_count", "status", "owner_id", "created_at", "updated_at"
+}
+RESTAURANT_SUMMARY_FIELDS = [
+    "name", "cuisine", "city", "address", "images", "price_range", "rating_avg", "rating_count"
+]
+ADMIN_RESTAURANT_SUMMARY_FIELDS = ["name", "cuisine", "city", "address", "status", "created_at", "updated_at"]
+MENU_ITEM_FIELDS = {"name", "description", "price", "image", "category", "restaurant_id", "created_at", "updated_at"}
+MENU_ITEM_SUMMARY_FIELDS = ["name", "description", "price", "image", "category"]
+
+def get_projection(allowed_fields, summary_fields, hidden_fields=()):
+    """Mongo projection for ?fields=a,b or ?view=full, defaulting to the summary shape"""
+    fields = request.args.get("fields")
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in allowed_fields]
+        if unknown:
+            abort(400, f"Unknown fields: {', '.join(unknown)}")
+        return {field: 1 for field in requested}
+    if request.args.get("view") == "full":
+        return {field: 0 for field in hidden_fields} or None
+    return {field: 1 for field in summary_fields}
+
+def encode_cursor(sort_value, doc_id):
+    """Opaque keyset cursor holding the last sort key and _id of a page"""
+    payload = json_util.dumps({"v": sort_value, "id": doc_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(token):
+    try:
+        payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json_util.loads(payload)
+        return data["v"], data["id"]
+    except (ValueError, TypeError, KeyError):
+        abort(400, "Invalid cursor")
+
+def keyset_filter(sort_field, direction, last_value, last_id):
+    """Match documents strictly after (last_value, last_id) in sort order"""
+    op = "$gt" if direction == ASCENDING else "$lt"
+    if sort_field == "_id":
+        return {"_id": {op: last_id}}
+    # Missing values sort lowest: before everything ascending, after everything descending
+    if last_value is None:
+        after = [{sort_field: None, "_id": {op: last_id}}]
+        if direction == ASCENDING:
+            after.append({sort_field: {"$ne": None}})
+        return {"$or": after}
+    after = [
+        {sort_field: {op: last_value}},
+        {sort_field: last_value, "_id": {op: last_id}}
+    ]
+    if direction == DESCENDING:
+        after.append({sort_field: None})
+    return {"$or": after}
+
+def paginate(collection, query, sort_field="_id", direction=ASCENDING, projection=None):
+    """Run a list query in offset mode (page) or keyset mode (cursor).
+
+    Passing ``cursor`` (empty for the first page) switches to keyset mode,
+    which never skips. Totals are computed unless ``include_total=false``;
+    in keyset mode they are off by default.
+    """
+    page, per_page = get_pagination_params()
+    cursor = request.args.get("cursor")
+    default_total = "false" if cursor is not None else "true"
+    include_total = request.args.get("include_total", default_total).lower() == "true"
+
+    find_query = query
+    if cursor:
+        find_query = {"$and": [query, keyset_filter(sort_field, direction, *decode_cursor(cursor))]}
+
+    # The sort key must survive an inclusion projection to build next_cursor
+    if projection and sort_field != "_id" and 1 in projection.values():
+        projection = {**projection, sort_field: 1}
+
+    sort = [(sort_field, direction)] if sort_field == "_id" else [(sort_field, direction), ("_id", direction)]
+    results = collection.find(find_query, projection).sort(sort)
+    if cursor is None:
+        results = results.skip((page - 1) * per_page)
+    docs = list(results.limit(per_page + 1))
+
+    has_more = len(docs) > per_page
+    docs = docs[:per_page]
+    pagination = {
+        "per_page": per_page,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(docs[-1].get(sort_field), docs[-1]["_id"]) if has_more else None
+    }
+    if cursor is None:
+        pagination["page"] = page
+    if include_total:
+        total = collection.count_documents(query)
+        pagination["total"] = total
+        pagination["total_pages"] = (total + per_page - 1) // per_page
+    return docs, pagination
+
+# ========================
+# Conditional Requests
+# ========================
+# Fields whose change alters what get_restaurant returns; reviews_version is
+# bumped by the review mutators and rebuild-restaurant-ratings (menu_version by
+# rebuild_menu_snapshot). Anything else writing restaurants must set updated_at
+RESTAURANT_VERSION_FIELDS = ["status", "updated_at", "reviews_version", "save_count", "menu_version"]
+
+def make_etag(*parts):
+    """Strong ETag over version parts (ids, timestamps, counters, query string)"""
+    return hashlib.sha256(dumps(parts).encode()).hexdigest()[:32]
+
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+def etag_response(payload, etag=None):
+    """jsonify with a strong ETag (body hash by default), answering 304 on a match"""
+    response = jsonify(payload)
+    response.set_etag(etag or hashlib.sha256(response.get_data()).hexdigest()[:32])
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+def bump_restaurant_version(restaurant_ids, field):
+    """Invalidate ETags derived from a restaurant's reviews_version"""
+    if not isinstance(restaurant_ids, list):
+        restaurant_ids = [restaurant_ids]
+    mongo.db.restaurants.update_many({"_id": {"$in": restaurant_ids}}, {"$inc": {field: 1}})
+
+    namespaces = []
+    for restaurant_id in restaurant_ids:
+        namespaces += ["reviews:", f"reviews:{restaurant_id}", f"restaurant:{restaurant_id}", "restaurants"]
+    invalidate_responses(*namespaces)
+
 def validate_price(price):
     try:
         value = float(price)
@@ -327,6 +766,231 @@ def has_role(required_role):
         return decorated_function
     return wrapper
 
+# ========================
+# In-Process Caching
+# ========================
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a fixed TTL"""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class FileCache:
+    """TTL cache kept as JSON files in one directory, shared by every worker process"""
+
+    def __init__(self, directory, maxsize=4096, ttl=60):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+        if entry is None or entry["expires"] < time.time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["value"]
+
+    def set(self, key, value, ttl=None):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"expires": time.time() + (ttl or self.ttl), "value": value}, f)
+        # Atomic rename so other workers never read a half-written entry
+        os.replace(tmp_path, self._path(key))
+        self._writes += 1
+        if self._writes % 256 == 0:
+            self._prune()
+
+    def invalidate(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _prune(self):
+        """Drop the oldest entries once the directory grows past maxsize"""
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.maxsize)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(os.listdir(self.directory)),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+# ========================
+# Response Cache
+# ========================
+# Anonymous GETs on the public read endpoints are cached whole. Every entry
+# key embeds the current generation of the namespaces it depends on, so a
+# mutator invalidates by dropping a generation instead of hunting for keys.
+RESPONSE_CACHE_TTLS = {"restaurants": 30, "restaurant": 60, "menu": 120, "reviews": 30}
+RESPONSE_GENERATION_TTL = 86400
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def _generation(self, namespace):
+        key = f"generation:{namespace}"
+        generation = self.backend.get(key)
+        if generation is None:
+            # Random rather than counted, so a lost generation can never revive old entries
+            generation = uuid.uuid4().hex
+            self.backend.set(key, generation, ttl=RESPONSE_GENERATION_TTL)
+        return generation
+
+    def key(self, namespaces, request_key):
+        return "|".join([request_key] + [self._generation(namespace) for namespace in namespaces])
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value, ttl):
+        self.backend.set(key, value, ttl=ttl)
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.invalidate(f"generation:{namespace}")
+
+    def clear(self):
+        self.backend.clear()
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+if RESPONSE_CACHE_BACKEND == "file":
+    response_cache = ResponseCache(FileCache(
+        os.getenv("RESPONSE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "closetable-responses")),
+        maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", 4096))
+    ))
+elif RESPONSE_CACHE_BACKEND == "memory":
+    response_cache = ResponseCache(TTLCache(maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", 2048))))
+else:
+    response_cache = None
+
+def invalidate_responses(*namespaces):
+    if response_cache is not None:
+        response_cache.invalidate(*namespaces)
+
+def cached_response(route, *namespaces):
+    """Serve anonymous GETs from response_cache.
+
+    Namespaces are formatted with the view arguments and query parameters,
+    e.g. ``menu:{restaurant_id}``; a missing parameter formats as empty.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if response_cache is None or request.headers.get("Authorization"):
+                return fn(*args, **kwargs)
+
+            params = defaultdict(str, {**request.args.to_dict(), **kwargs})
+            request_key = f"{request.path}?{urlencode(sorted(request.args.items(multi=True)))}"
+            # Generations are read before the view runs, so a write racing the
+            # view leaves its result under an already-invalidated key
+            key = response_cache.key([namespace.format_map(params) for namespace in namespaces], request_key)
+
+            cached = response_cache.get(key)
+            if cached is None:
+                response = app.make_response(fn(*args, **kwargs))
+                if response.status_code == 200:
+                    response_cache.set(key, {
+                        "body": response.get_data(as_text=True),
+                        "mimetype": response.mimetype,
+                        "headers": {name: response.headers[name] for name in ("ETag", "Cache-Control") if name in response.headers}
+                    }, RESPONSE_CACHE_TTLS[route])
+                return response
+
+            response = Response(cached["body"], mimetype=cached["mimetype"], headers=cached["headers"])
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
 # JWT Callbacks
 @jwt.token_in_blocklist_loader
 def check_if_token_revoked(jwt_header, jwt_payload):
@@ -485,7 +1149,6 @@ def signup():
             "role": "Customer",
             "created_at": datetime.now(timezone.utc),
             "verified": False,
-            "saved_restaurants": [],
             **encrypted_data
         }
 
@@ -525,7 +1188,14 @@ def associate_images():
 @limiter.limit("5/minute")
 @jwt_required()
 def upload_image():
+    work_dir = None
     try:
+        # Refuse oversized bodies before the multipart parser reads them
+        if request.content_length is None:
+            abort(411, "Content-Length required")
+        if request.content_length > MAX_FILE_SIZE + MAX_UPLOAD_OVERHEAD:
+            abort(413, description="File too large")
+
         current_user_id = ObjectId(get_jwt_identity())
         user = mongo.db.users.find_one({"_id": current_user_id})
        
@@ -537,12 +1207,6 @@ def upload_image():
             })
             if not restaurant and user["role"] != "Admin":
                 abort(403, "Not authorized for this restaurant")
-        file_data = file.read()     
-
-        if len(file_data) > MAX_FILE_SIZE:
-            abort(413, description="File too large")
-
-            compressed_data = compress_image(file_data)
         
         if 'file' not in request.files:
             abort(400, description="No file part")
@@ -554,45 +1218,80 @@ def upload_image():
         if not allowed_file(file.filename):
             abort(400, "Invalid file type")
 
-        # Read content once and reuse
-        
-        
-
-        
-        
-        # Reset pointer after read
-        file.seek(0)
-
-        filename = secure_filename(file.filename)
-        file_id = fs.put(
-            file,
-            BytesIO(compressed_data),
-            filename=filename,
-            content_type=file.content_type,
-            metadata={
-                "uploader_id": current_user_id,
-                "restaurant_id": request.form.get('restaurant_id'),
-                "menu_item_id": request.form.get('menu_item_id')
-            }
+        # Copy to disk in chunks, cutting off as soon as the limit is passed
+        work_dir = tempfile.mkdtemp(prefix="upload-")
+        source_path = os.path.join(work_dir, "source")
+        with open(source_path, "wb") as source:
+            size = 0
+            for chunk in iter(lambda: file.stream.read(UPLOAD_CHUNK_SIZE), b""):
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    abort(413, description="File too large")
+                source.write(chunk)
+
+        output_path, content_type, derivatives = run_image_job(process_image_upload, source_path, work_dir)
+
+        menu_item_id = request.form.get('menu_item_id')
+        metadata = {
+            "uploader_id": current_user_id,
+            "restaurant_id": ObjectId(restaurant_id) if restaurant_id else None,
+            "menu_item_id": ObjectId(menu_item_id) if menu_item_id and ObjectId.is_valid(menu_item_id) else None
+        }
+        file_id = store_gridfs_file(
+            output_path,
+            filename=secure_filename(file.filename),
+            content_type=content_type,
+            metadata=metadata
         )
+        linked = store_image_derivatives(file_id, derivatives, metadata)
 
-        return jsonify({"file_id": str(file_id)}), 201
+        return jsonify({
+            "file_id": str(file_id),
+            "derivatives": [
+                {"file_id": str(derivative["file_id"]), "width": derivative["width"], "content_type": derivative["content_type"]}
+                for derivative in linked
+            ]
+        }), 201
 
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
+    except InvalidId:
+        return jsonify({"error": "Invalid restaurant ID"}), 400
     except PyMongoError as e:
         app.logger.error(f"Image upload error: {str(e)}")
-        abort(500)
+        return jsonify({"error": "Upload failed"}), 500
+    except FutureTimeoutError:
+        # Must precede OSError: on Python 3.11+ this is the builtin TimeoutError
+        app.logger.warning("Image processing timed out")
+        return jsonify({"error": "Image processing timed out, try again shortly"}), 503
+    except (OSError, ValueError) as e:
+        # Pillow could not decode the upload
+        app.logger.warning(f"Image processing failed: {str(e)}")
+        return jsonify({"error": "Invalid image file"}), 400
+    except Exception as e:
+        app.logger.error(f"Image upload error: {str(e)}")
+        return jsonify({"error": "Upload failed"}), 500
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
 
 # Get Image Endpoint
 @app.route('/api/images/<file_id>')
 def get_image(file_id):
     try:
-        grid_file = fs.get(ObjectId(file_id))
+        image_id = ObjectId(file_id)
+        width = request.args.get("w", type=int)
+        if width:
+            image_id = pick_image_variant(image_id, width)
+
+        grid_file = fs.get(image_id)
         response = send_file(
             grid_file,
             mimetype=grid_file.content_type,
             as_attachment=False
         )
         response.headers['Cache-Control'] = 'max-age=604800'  # 1 week
+        response.headers['Vary'] = 'Accept'
         return response
     except InvalidId:
         abort(400, "Invalid image ID format")
@@ -634,42 +1333,327 @@ def complete_owner_profile():
 
 # Restaurant Routes
 @app.route("/api/restaurants", methods=["GET"])
+@cached_response("restaurants", "restaurants")
 def get_restaurants():
     try:
        
-        page, per_page = get_pagination_params()
         query = {"status": "approved"}
-        skip = (page - 1) * per_page
         
         name = request.args.get("name")
         cuisine = request.args.get("cuisine")
-        
+        search = request.args.get("q", "").strip()
+        projection = get_projection(RESTAURANT_FIELDS, RESTAURANT_SUMMARY_FIELDS, ["admin_notes"])
 
+        if search:
+            return search_restaurants(query, search, cuisine, projection)
         
         if name:
             query["name"] = {"$regex": re.escape(name), "$options": "i"}
         if cuisine:
             query["cuisine"] = {"$regex": re.escape(cuisine), "$options": "i"}
 
+        sort_field, direction = "_id", ASCENDING
+        min_rating = request.args.get("min_rating", type=float)
+        if request.args.get("sort") == "rating":
+            # Unrated restaurants have no rating_avg and are left out of rating order
+            sort_field, direction = "rating_avg", DESCENDING
+            min_rating = min_rating or 0
+        elif request.args.get("sort") == "popular":
+            sort_field, direction = "save_count", DESCENDING
+        if min_rating is not None:
+            query["rating_avg"] = {"$gte": min_rating}
     	
-        total = mongo.db.restaurants.count_documents(query)
-        restaurants = list(mongo.db.restaurants.find(query)
-            .skip(skip)
-            .limit(per_page))
+        if request.args.get("facets", "false").lower() == "true":
+            return list_restaurants_with_facets(query, projection, sort_field, direction)
+
+        restaurants, pagination = paginate(
+            mongo.db.restaurants, query, sort_field, direction, projection=projection
+        )
             
-        return jsonify({
+        return etag_response({
             'data': json.loads(dumps(restaurants)),
-            'total': total,
-            'page': page,
-            'per_page': per_page
-        }), 200
+            **pagination
+        })
 
-       
-    
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
     except Exception as e:
          app.logger.error(f"Error: {str(e)}")
     return jsonify({"error": "Internal server error"}), 500
 
+# ========================
+# Faceted Browse
+# ========================
+PRICE_BANDS = {1: "$", 2: "$$", 3: "$$$", 4: "$$$$"}
+RATING_BAND_BOUNDARIES = [1, 2, 3, 4, 4.5, 5.01]
+
+# Facets only depend on the filter, not the page, so they are cached on their own
+facet_cache = TTLCache(maxsize=512, ttl=int(os.getenv("FACET_CACHE_TTL", 120)))
+
+RESTAURANT_FACETS = {
+    "cuisine": [
+        {"$group": {"_id": "$cuisine", "count": {"$sum": 1}}},
+        {"$sort": {"count": DESCENDING, "_id": ASCENDING}}
+    ],
+    "city": [
+        {"$group": {"_id": "$city", "count": {"$sum": 1}}},
+        {"$sort": {"count": DESCENDING, "_id": ASCENDING}}
+    ],
+    "price_band": [
+        {"$group": {"_id": {"$ifNull": ["$price_range", None]}, "count": {"$sum": 1}}},
+        {"$sort": {"_id": ASCENDING}}
+    ],
+    "rating_band": [
+        {"$bucket": {
+            "groupBy": "$rating_avg",
+            "boundaries": RATING_BAND_BOUNDARIES,
+            "default": "unrated",
+            "output": {"count": {"$sum": 1}}
+        }}
+    ]
+}
+
+
+def format_facets(raw):
+    """Turn $facet output into label/count lists"""
+    facets = {
+        field: [{"value": row["_id"], "count": row["count"]} for row in raw.get(field, []) if row["_id"]]
+        for field in ("cuisine", "city")
+    }
+    facets["price_band"] = [
+        {"value": row["_id"], "label": PRICE_BANDS.get(row["_id"], "unknown"), "count": row["count"]}
+        for row in raw.get("price_band", [])
+    ]
+    bounds = dict(zip(RATING_BAND_BOUNDARIES, RATING_BAND_BOUNDARIES[1:]))
+    facets["rating_band"] = [
+        {
+            "value": row["_id"],
+            "label": "unrated" if row["_id"] == "unrated" else f"{row['_id']}-{min(bounds[row['_id']], 5)}",
+            "count": row["count"]
+        }
+        for row in raw.get("rating_band", [])
+    ]
+    return facets
+
+
+def list_restaurants_with_facets(query, projection=None, sort_field="_id", direction=ASCENDING):
+    """Page of restaurants plus facet counts from a single $facet aggregation"""
+    page, per_page = get_pagination_params()
+    cache_key = dumps(query, sort_keys=True)
+    if projection and sort_field != "_id" and 1 in projection.values():
+        projection = {**projection, sort_field: 1}
+    facets = facet_cache.get(cache_key)
+
+    if facets is not None or request.args.get("cursor") is not None:
+        restaurants, pagination = paginate(
+            mongo.db.restaurants, query, sort_field, direction, projection=projection
+        )
+        if facets is None:
+            raw = next(mongo.db.restaurants.aggregate([
+                {"$match": query},
+                {"$facet": RESTAURANT_FACETS}
+            ]))
+            facets = format_facets(raw)
+            facet_cache.set(cache_key, facets)
+    else:
+        raw = next(mongo.db.restaurants.aggregate([
+            {"$match": query},
+            {"$facet": {
+                "results": [
+                    {"$sort": {sort_field: direction, "_id": direction}},
+                    {"$skip": (page - 1) * per_page},
+                    {"$limit": per_page + 1}
+                ] + ([{"$project": projection}] if projection else []),
+                "total": [{"$count": "count"}],
+                **RESTAURANT_FACETS
+            }}
+        ]))
+        facets = format_facets(raw)
+        facet_cache.set(cache_key, facets)
+
+        restaurants = raw["results"][:per_page]
+        total = raw["total"][0]["count"] if raw["total"] else 0
+        has_more = len(raw["results"]) > per_page
+        pagination = {
+            "per_page": per_page,
+            "has_more": has_more,
+            "next_cursor": encode_cursor(restaurants[-1].get(sort_field), restaurants[-1]["_id"]) if has_more else None,
+            "page": page,
+            "total": total,
+            "total_pages": (total + per_page - 1) // per_page
+        }
+
+    return etag_response({
+        'data': json.loads(dumps(restaurants)),
+        **pagination,
+        'facets': facets
+    })
+
+
+def search_restaurants(query, search, cuisine=None, projection=None):
+    """Relevance-ranked $text search over approved restaurant names"""
+    page, per_page = get_pagination_params()
+    query = {**query, "$text": {"$search": bleach.clean(search)}}
+    if cuisine:
+        # Same case-insensitive match as the list endpoint; $text rejects a
+        # non-simple collation, so a regex stands in for it. Still checked
+        # against the text index's cuisine suffix rather than the documents
+        query["cuisine"] = {"$regex": re.escape(bleach.clean(cuisine).strip()), "$options": "i"}
+
+    results = list(mongo.db.restaurants.find(query, {**(projection or {}), "score": {"$meta": "textScore"}})
+        .sort([("score", {"$meta": "textScore"}), ("_id", ASCENDING)])
+        .skip((page - 1) * per_page)
+        .limit(per_page + 1))
+
+    pagination = {
+        "page": page,
+        "per_page": per_page,
+        "has_more": len(results) > per_page
+    }
+    if request.args.get("include_total", "true").lower() == "true":
+        total = mongo.db.restaurants.count_documents(query)
+        pagination["total"] = total
+        pagination["total_pages"] = (total + per_page - 1) // per_page
+
+    return etag_response({
+        'data': json.loads(dumps(results[:per_page])),
+        **pagination
+    })
+
+# ========================
+# Autocomplete
+# ========================
+AUTOCOMPLETE_TYPES = ("name", "cuisine", "city")
+AUTOCOMPLETE_REFRESH_SECONDS = int(os.getenv("AUTOCOMPLETE_REFRESH_SECONDS", 300))
+MAX_AUTOCOMPLETE_SCAN = 200
+
+
+class AutocompleteIndex:
+    """In-memory sorted prefix index over approved restaurant names, cuisines and cities.
+
+    Each snapshot is immutable and swapped in whole, so lookups never lock or
+    touch Mongo; refreshes run on a background thread.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._built_at = 0.0
+        self._refreshing = False
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build_snapshot(restaurants):
+        entries = {kind: [] for kind in AUTOCOMPLETE_TYPES}
+        counts = {"cuisine": Counter(), "city": Counter()}
+        for restaurant in restaurants:
+            name = restaurant.get("name") or ""
+            words = name.lower().split()
+            # Index every word start so "kar" finds "Lahore Karahi House"
+            for position in range(len(words)):
+                entries["name"].append((" ".join(words[position:]), name, str(restaurant["_id"])))
+            for kind in ("cuisine", "city"):
+                value = (restaurant.get(kind) or "").strip()
+                if value:
+                    counts[kind][value] += 1
+
+        for kind in ("cuisine", "city"):
+            entries[kind] = [(value.lower(), value, count) for value, count in counts[kind].items()]
+
+        snapshot = {}
+        for kind, rows in entries.items():
+            rows.sort()
+            snapshot[kind] = ([row[0] for row in rows], rows)
+        return snapshot
+
+    def refresh(self):
+        restaurants = mongo.db.restaurants.find(
+            {"status": "approved"}, {"name": 1, "cuisine": 1, "city": 1}
+        )
+        snapshot = self._build_snapshot(restaurants)
+        with self._lock:
+            self._snapshot = snapshot
+            self._built_at = time.monotonic()
+
+    def refresh_async(self):
+        """Refresh in the background; requests made mid-refresh trigger one more pass"""
+        with self._lock:
+            self._dirty = True
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            while True:
+                with self._lock:
+                    if not self._dirty:
+                        self._refreshing = False
+                        return
+                    self._dirty = False
+                try:
+                    self.refresh()
+                except Exception as e:
+                    app.logger.error(f"Autocomplete refresh error: {str(e)}")
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def suggest(self, prefix, kinds=AUTOCOMPLETE_TYPES, limit=8):
+        if self._snapshot is None:
+            self.refresh()
+        elif time.monotonic() - self._built_at > AUTOCOMPLETE_REFRESH_SECONDS:
+            # Picks up writes handled by other worker processes
+            self.refresh_async()
+
+        prefix = prefix.lower().strip()
+        snapshot = self._snapshot
+        suggestions = []
+        for kind in kinds:
+            keys, rows = snapshot[kind]
+            start = bisect.bisect_left(keys, prefix)
+            matches = []
+            seen = set()
+            for key, display, extra in rows[start:start + MAX_AUTOCOMPLETE_SCAN]:
+                if not key.startswith(prefix):
+                    break
+                if kind == "name":
+                    if extra in seen:
+                        continue
+                    seen.add(extra)
+                    matches.append({"type": kind, "value": display, "id": extra})
+                    if len(matches) >= limit:
+                        break
+                else:
+                    matches.append({"type": kind, "value": display, "count": extra})
+            if kind != "name":
+                matches = sorted(matches, key=lambda match: -match["count"])[:limit]
+            suggestions.extend(matches)
+        return suggestions
+
+
+autocomplete_index = AutocompleteIndex()
+
+
+@app.route("/api/autocomplete", methods=["GET"])
+# Replaces the hourly/daily defaults: type-ahead sends one request per keystroke
+@limiter.limit("60/minute")
+def autocomplete():
+    try:
+        prefix = request.args.get("q", "")
+        if not prefix.strip():
+            return jsonify({"suggestions": []}), 200
+
+        kinds = [kind for kind in request.args.get("types", ",".join(AUTOCOMPLETE_TYPES)).split(",")
+                 if kind in AUTOCOMPLETE_TYPES]
+        limit = min(max(1, int(request.args.get("limit", 8))), 20)
+
+        return jsonify({"suggestions": autocomplete_index.suggest(prefix, kinds, limit)}), 200
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    except Exception as e:
+        app.logger.error(f"Autocomplete error: {str(e)}")
+        return jsonify({"error": "Autocomplete failed"}), 500
+
+
 @app.route("/api/restaurants", methods=["POST"])
 @jwt_required()
 def create_restaurant():
@@ -726,6 +1710,16 @@ def create_restaurant():
                 ):
                     abort(400, "Restaurant name already exists")
 
+                price_range = data.get("price_range")
+                if price_range is not None and price_range not in PRICE_BANDS:
+                    return jsonify({"error": "price_range must be between 1-4"}), 400
+
+                location = None
+                if data.get("location") is not None:
+                    location = parse_location(data["location"])
+                    if not location:
+                        return jsonify({"error": "Invalid location"}), 400
+
                 # Create restaurant
                 restaurant = {
                     "name": clean_name,
@@ -738,9 +1732,14 @@ def create_restaurant():
                     "description": bleach.clean(data.get("description", "")).strip(),
                     "owner_id": user_id,
                     "status": "pending",
+                    "save_count": 0,
                     "created_at": datetime.now(timezone.utc),
                     "updated_at": datetime.now(timezone.utc)
                 }
+                if location:
+                    restaurant["location"] = location
+                if price_range is not None:
+                    restaurant["price_range"] = price_range
 
                 result = mongo.db.restaurants.insert_one(restaurant, session=session)
                 
@@ -758,8 +1757,18 @@ def create_restaurant():
         return jsonify({"error": "Restaurant submission failed"}), 500
     
 @app.route("/api/restaurants/<id>", methods=["GET"])
+@cached_response("restaurant", "restaurant:{id}")
 def get_restaurant(id):
     try:
+        # Answer polling clients from the version fields alone
+        version = mongo.db.restaurants.find_one(
+            {"_id": ObjectId(id)}, {field: 1 for field in RESTAURANT_VERSION_FIELDS}
+        )
+        if version and version["status"] == "approved":
+            etag = make_etag(id, *[version.get(field) for field in RESTAURANT_VERSION_FIELDS])
+            if request.if_none_match.contains(etag):
+                return not_modified(etag)
+
         restaurant = mongo.db.restaurants.find_one({"_id": ObjectId(id)})
         if not restaurant:
             app.logger.error(f"Restaurant {id} not found")
@@ -769,63 +1778,571 @@ def get_restaurant(id):
             return jsonify({"error": "Restaurant not available"}), 403
         if not restaurant or restaurant["status"] != "approved":
             abort(404, "Restaurant not found or not approved")
-        return jsonify(json.loads(dumps(restaurant))), 200
+        etag = make_etag(id, *[restaurant.get(field) for field in RESTAURANT_VERSION_FIELDS])
+        return etag_response(json.loads(dumps(restaurant)), etag)
     except InvalidId:
         app.logger.error(f"Invalid ID format: {id}")
         return jsonify({"error": "Invalid ID format"}), 400
     except PyMongoError as e:
         app.logger.error(f"MongoDB error: {str(e)}")
         return jsonify({"error": "Database error"}), 500
+# ========================
+# Availability Engine
+# ========================
+SLOT_MINUTES = 30
+SLOT_DURATION = timedelta(minutes=SLOT_MINUTES)
+INACTIVE_RESERVATION_STATUSES = ["canceled", "rejected"]
+
+
+def to_utc(dt):
+    """Normalize a datetime to aware UTC (naive values from Mongo are UTC)"""
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+class RestaurantSchedule:
+    """Compiled opening hours, timezone and slot grid for one restaurant.
+
+    Hours are kept as minutes from local midnight per weekday. When close is
+    earlier than open the service runs past midnight and its late slots
+    belong to the day it opened.
+    """
+
+    def __init__(self, restaurant):
+        self.restaurant_id = restaurant["_id"]
+        self.capacity = restaurant.get("capacity", 0)
+        self.tz = pytz.timezone(restaurant.get("timezone") or "UTC")
+        opening_hours = restaurant.get("opening_hours") or {}
+        self.hours = [self._parse_hours(opening_hours.get(day)) for day in WEEKDAYS]
+        self.slot_offsets = [
+            list(range(hours[0], hours[1], SLOT_MINUTES)) if hours else []
+            for hours in self.hours
+        ]
+
+    @staticmethod
+    def _parse_hours(opening):
+        if not opening or not opening.get("open") or not opening.get("close"):
+            return None
+        open_hour, open_minute = map(int, opening["open"].split(":"))
+        close_hour, close_minute = map(int, opening["close"].split(":"))
+        open_at = open_hour * 60 + open_minute
+        close_at = close_hour * 60 + close_minute
+        if close_at == open_at:
+            return None
+        if close_at < open_at:
+            close_at += 24 * 60
+        return open_at, close_at
+
+    def _at(self, service_date, minutes):
+        local = datetime.combine(service_date, datetime.min.time()) + timedelta(minutes=minutes)
+        # normalize() moves wall times skipped at spring-forward onto the real clock
+        return self.tz.normalize(self.tz.localize(local)).astimezone(timezone.utc)
+
+    def _locate(self, dt_utc):
+        """Return (service date, minutes since its midnight) if open at dt_utc"""
+        local = to_utc(dt_utc).astimezone(self.tz)
+        minutes = local.hour * 60 + local.minute + local.second / 60
+        hours = self.hours[local.weekday()]
+        if hours and hours[0] <= minutes < hours[1]:
+            return local.date(), minutes
+        previous = local.date() - timedelta(days=1)
+        hours = self.hours[previous.weekday()]
+        if hours and minutes + 24 * 60 < hours[1]:
+            return previous, minutes + 24 * 60
+        return None
+
+    def is_open_at(self, dt_utc):
+        return self._locate(dt_utc) is not None
+
+    def slot_for(self, dt_utc):
+        """UTC start of the slot containing dt_utc, or None when closed"""
+        located = self._locate(dt_utc)
+        if not located:
+            return None
+        service_date, minutes = located
+        open_at = self.hours[service_date.weekday()][0]
+        return self._at(service_date, open_at + int(minutes - open_at) // SLOT_MINUTES * SLOT_MINUTES)
+
+    def slots_for_date(self, service_date):
+        """UTC start of every slot in the service that opens on a local date"""
+        slots = []
+        for offset in self.slot_offsets[service_date.weekday()]:
+            slot = self._at(service_date, offset)
+            # Wall times skipped by a DST change map onto later slots; keep each instant once
+            if not slots or slot > slots[-1]:
+                slots.append(slot)
+        return slots
+
+    def service_date(self, dt_utc):
+        """Local date whose service contains dt_utc (the calendar date when closed)"""
+        located = self._locate(dt_utc)
+        return located[0] if located else to_utc(dt_utc).astimezone(self.tz).date()
+
+
+# Keyed by (restaurant_id, updated_at) so an edited document never reuses
+# a stale schedule, even in workers that missed the explicit invalidation.
+schedule_cache = TTLCache(maxsize=int(os.getenv("SCHEDULE_CACHE_SIZE", 4096)), ttl=3600)
+
+
+def invalidate_restaurant_schedule(restaurant_id):
+    restaurant_id = str(restaurant_id)
+    schedule_cache.invalidate_where(lambda key: key[0] == restaurant_id)
+
+
+def get_restaurant_schedule(restaurant):
+    """Return the compiled schedule for a restaurant document"""
+    key = (str(restaurant["_id"]), str(restaurant.get("updated_at")))
+    schedule = schedule_cache.get(key)
+    if schedule is None:
+        schedule = RestaurantSchedule(restaurant)
+        schedule_cache.set(key, schedule)
+    return schedule
+
+
+def fetch_slot_covers(restaurants, start_utc, end_utc):
+    """Sum booked party sizes per (restaurant, slot) in a single aggregation"""
+    restaurants = {restaurant["_id"]: restaurant for restaurant in restaurants}
+    pipeline = [
+        {"$match": {
+            "restaurant_id": {"$in": list(restaurants)},
+            "datetime": {"$gte": start_utc, "$lt": end_utc},
+            "status": {"$nin": INACTIVE_RESERVATION_STATUSES}
+        }},
+        {"$group": {
+            "_id": {
+                "restaurant_id": "$restaurant_id",
+                "slot_start": "$slot_start",
+                # Legacy reservations without slot_start stay grouped by their
+                # exact time and are bucketed with the restaurant schedule below
+                "datetime": {"$cond": [{"$ifNull": ["$slot_start", False]}, None, "$datetime"]}
+            },
+            "covers": {"$sum": "$party_size"}
+        }}
+    ]
+    covers = {}
+    for row in mongo.db.reservations.aggregate(pipeline):
+        restaurant_id = row["_id"]["restaurant_id"]
+        slot = get_reservation_slot(row["_id"], restaurants[restaurant_id])
+        covers[(restaurant_id, slot)] = covers.get((restaurant_id, slot), 0) + row["covers"]
+    return covers
+
+
+def build_slot_availability(restaurant, slots, covers, party_size=1):
+    """Compute remaining capacity for each slot from pre-fetched covers"""
+    local_tz = get_restaurant_schedule(restaurant).tz
+    capacity = restaurant["capacity"]
+    result = []
+    for slot in slots:
+        booked = covers.get((restaurant["_id"], slot), 0)
+        remaining = max(0, capacity - booked)
+        result.append({
+            "start": slot.astimezone(local_tz).isoformat(),
+            "booked": booked,
+            "remaining": remaining,
+            "available": remaining >= party_size
+        })
+    return result
+
+
+# Day availability keyed by (restaurant_id, local date). Entries are
+# invalidated by reservation and restaurant writes; the TTL bounds staleness
+# for writes made by other worker processes.
+availability_cache = TTLCache(
+    maxsize=int(os.getenv("AVAILABILITY_CACHE_SIZE", 2048)),
+    ttl=int(os.getenv("AVAILABILITY_CACHE_TTL", 60))
+)
+
+
+def invalidate_availability(restaurant_id, *local_dates):
+    """Drop cached availability for specific dates, or every date when none given"""
+    restaurant_id = str(restaurant_id)
+    if local_dates:
+        for local_date in local_dates:
+            availability_cache.invalidate((restaurant_id, local_date.isoformat()))
+    else:
+        availability_cache.invalidate_where(lambda key: key[0] == restaurant_id)
+
+
+def get_day_availability(restaurant_id, local_date, restaurant=None):
+    """Per-slot booked/remaining counts for a day, served from cache when possible"""
+    key = (str(restaurant_id), local_date.isoformat())
+    slot_states = availability_cache.get(key)
+    if slot_states is not None:
+        return slot_states
+
+    if restaurant is None:
+        restaurant = mongo.db.restaurants.find_one({"_id": ObjectId(restaurant_id)})
+    if not restaurant:
+        abort(404, "Restaurant not found")
+
+    slot_states = []
+    slots = get_restaurant_schedule(restaurant).slots_for_date(local_date)
+    if slots:
+        # One aggregation for the whole day instead of a query per slot
+        covers = fetch_slot_covers([restaurant], slots[0], slots[-1] + SLOT_DURATION)
+        slot_states = build_slot_availability(restaurant, slots, covers)
+
+    availability_cache.set(key, slot_states)
+    return slot_states
+
+
 @app.route("/api/restaurants/<id>/availability", methods=["GET"])
 def get_availability(id):
     try:
         date_str = request.args.get("date")
         if not date_str:
             abort(400, "Date parameter required")
-            
-        target_date = datetime.fromisoformat(date_str)
+
+        target_date = datetime.fromisoformat(date_str).date()
+        party_size = int(request.args.get("party_size", 1))
+        if party_size <= 0:
+            abort(400, "Invalid party size")
+
+        slot_states = [
+            {**slot, "available": slot["remaining"] >= party_size}
+            for slot in get_day_availability(id, target_date)
+        ]
+
+        return jsonify({
+            "available_slots": [slot["start"] for slot in slot_states if slot["available"]],
+            "slots": slot_states
+        })
+
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
+    except InvalidId:
+        return jsonify({"error": "Invalid ID format"}), 400
+    except ValueError:
+        return jsonify({"error": "Invalid date or party size"}), 400
+    except Exception as e:
+        app.logger.error(f"Availability error: {str(e)}")
+        return jsonify({"error": "Failed to check availability"}), 500
+
+MAX_CALENDAR_DAYS = 31
+
+@app.route("/api/restaurants/<id>/availability/calendar", methods=["GET"])
+def get_availability_calendar(id):
+    try:
         restaurant = mongo.db.restaurants.find_one({"_id": ObjectId(id)})
-        
         if not restaurant:
             abort(404, "Restaurant not found")
-        
-        # Get day of week
-        day_of_week = target_date.strftime("%A").lower()
-        opening = restaurant["opening_hours"].get(day_of_week, {})
-        
-        if not opening.get("open") or not opening.get("close"):
-            return jsonify({"available_slots": []})
-        
-        # Generate time slots
-        open_time = datetime.strptime(opening["open"], "%H:%M").time()
-        close_time = datetime.strptime(opening["close"], "%H:%M").time()
-        current = datetime.combine(target_date, open_time)
-        end = datetime.combine(target_date, close_time)
-        slot_duration = timedelta(minutes=30)
-        
-        available_slots = []
-        while current < end:
-            slot_end = current + slot_duration
-            # Check existing reservations
-            reserved = mongo.db.reservations.count_documents({
-                "restaurant_id": ObjectId(id),
-                "datetime": {
-                    "$gte": current,
-                    "$lt": slot_end
-                }
+
+        # Dates are interpreted in the restaurant's own timezone
+        schedule = get_restaurant_schedule(restaurant)
+        today = datetime.now(schedule.tz).date()
+        start_date = datetime.fromisoformat(request.args["start"]).date() if request.args.get("start") else today
+        end_date = datetime.fromisoformat(request.args["end"]).date() if request.args.get("end") else start_date + timedelta(days=6)
+        party_size = int(request.args.get("party_size", 1))
+
+        if end_date < start_date:
+            abort(400, "End date must not be before start date")
+        if (end_date - start_date).days + 1 > MAX_CALENDAR_DAYS:
+            abort(400, f"Date range cannot exceed {MAX_CALENDAR_DAYS} days")
+        if party_size <= 0:
+            abort(400, "Invalid party size")
+
+        days = []
+        current = start_date
+        while current <= end_date:
+            days.append((current, schedule.slots_for_date(current)))
+            current += timedelta(days=1)
+
+        # A single reservation scan covers every slot in the range
+        all_slots = [slot for _, slots in days for slot in slots]
+        covers = {}
+        if all_slots:
+            covers = fetch_slot_covers([restaurant], min(all_slots), max(all_slots) + SLOT_DURATION)
+
+        calendar = []
+        for day, slots in days:
+            slot_states = build_slot_availability(restaurant, slots, covers, party_size)
+            calendar.append({
+                "date": day.isoformat(),
+                "open": bool(slots),
+                "available_slots": [slot["start"] for slot in slot_states if slot["available"]],
+                "slots": slot_states
             })
-            if reserved < restaurant["capacity"]:
-                available_slots.append(current.isoformat())
-            current += slot_duration
-        
-        return jsonify({"available_slots": available_slots})
-    
+
+        return jsonify({
+            "restaurant_id": id,
+            "timezone": restaurant.get("timezone", "UTC"),
+            "days": calendar
+        }), 200
+
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
+    except InvalidId:
+        return jsonify({"error": "Invalid ID format"}), 400
     except ValueError:
-        abort(400, "Invalid date format")
+        return jsonify({"error": "Invalid date or party size"}), 400
     except Exception as e:
-        app.logger.error(f"Availability error: {str(e)}")
+        app.logger.error(f"Availability calendar error: {str(e)}")
         return jsonify({"error": "Failed to check availability"}), 500
 
+# ========================
+# Restaurant Page Bundle
+# ========================
+# Small shared pool: each bundle fans out three independent queries
+bundle_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BUNDLE_WORKERS", 8)), thread_name_prefix="bundle"
+)
+
+def fetch_bundle_reviews(restaurant_id, per_page):
+    """First page of a restaurant's reviews in get_reviews cursor order"""
+    reviews = list(mongo.db.reviews.find({"restaurant_id": restaurant_id})
+        .sort([("created_at", DESCENDING), ("_id", DESCENDING)])
+        .limit(per_page + 1))
+    has_more = len(reviews) > per_page
+    reviews = reviews[:per_page]
+    return reviews, {
+        "per_page": per_page,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(reviews[-1]["created_at"], reviews[-1]["_id"]) if has_more else None
+    }
+
+@app.route("/api/restaurants/<id>/bundle", methods=["GET"])
+def get_restaurant_bundle(id):
+    """Restaurant, menu, first page of reviews and one day's availability in one response"""
+    try:
+        restaurant = mongo.db.restaurants.find_one(
+            {"_id": ObjectId(id), "status": "approved"}, {"admin_notes": 0}
+        )
+        if not restaurant:
+            abort(404, "Restaurant not found or not approved")
+
+        date_str = request.args.get("date")
+        local_date = (datetime.fromisoformat(date_str).date() if date_str
+                      else get_local_date(restaurant, datetime.now(timezone.utc)))
+        _, per_page = get_pagination_params()
+
+        menu = bundle_executor.submit(get_menu_snapshot, restaurant["_id"])
+        reviews = bundle_executor.submit(fetch_bundle_reviews, restaurant["_id"], per_page)
+        availability = bundle_executor.submit(get_day_availability, id, local_date, restaurant)
+
+        review_page, review_pagination = reviews.result()
+        slot_states = availability.result()
+
+        return etag_response({
+            "restaurant": json.loads(dumps(restaurant)),
+            "menu": json.loads(menu.result()["payload"])["items"],
+            "reviews": {
+                "data": json.loads(dumps(review_page)),
+                "pagination": review_pagination,
+                "summary": {
+                    "rating_avg": restaurant.get("rating_avg"),
+                    "rating_count": restaurant.get("rating_count", 0),
+                    "rating_histogram": restaurant.get("rating_histogram", {})
+                }
+            },
+            "availability": {
+                "date": local_date.isoformat(),
+                "available_slots": [slot["start"] for slot in slot_states if slot["available"]],
+                "slots": slot_states
+            }
+        })
+
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
+    except InvalidId:
+        return jsonify({"error": "Invalid ID format"}), 400
+    except ValueError:
+        return jsonify({"error": "Invalid date format"}), 400
+    except Exception as e:
+        app.logger.error(f"Restaurant bundle error: {str(e)}")
+        return jsonify({"error": "Failed to load restaurant"}), 500
+
+DEFAULT_NEARBY_RADIUS_M = 5000
+MAX_NEARBY_RADIUS_M = 50000
+
+def get_nearby_radius():
+    """?radius in metres, capped at MAX_NEARBY_RADIUS_M; 400 unless a positive number"""
+    try:
+        radius = float(request.args.get("radius", DEFAULT_NEARBY_RADIUS_M))
+    except ValueError:
+        abort(400, "Invalid radius")
+    # Written this way round so NaN is rejected too
+    if not radius > 0:
+        abort(400, "Radius must be a positive number of metres")
+    return min(radius, MAX_NEARBY_RADIUS_M)
+
+@app.route("/api/restaurants/nearby", methods=["GET"])
+def get_nearby_restaurants():
+    try:
+        lat = float(request.args["lat"])
+        lng = float(request.args["lng"])
+        point = parse_location({"lat": lat, "lng": lng})
+        if not point:
+            abort(400, "Invalid coordinates")
+        radius = get_nearby_radius()
+        _, per_page = get_pagination_params()
+
+        query = {"status": "approved"}
+        if request.args.get("cuisine"):
+            query["cuisine"] = bleach.clean(request.args["cuisine"]).strip()
+
+        geo_near = {
+            "near": point,
+            "distanceField": "distance",
+            "maxDistance": radius,
+            "query": query,
+            "key": "location",
+            "spherical": True
+        }
+        pipeline = [{"$geoNear": geo_near}]
+
+        # Keyset on (distance, _id): resume at the last distance and skip ties already sent
+        cursor = request.args.get("cursor")
+        if cursor:
+            last_distance, last_id = decode_cursor(cursor)
+            geo_near["minDistance"] = last_distance
+            pipeline.append({"$match": {"$or": [
+                {"distance": {"$gt": last_distance}},
+                {"distance": last_distance, "_id": {"$gt": last_id}}
+            ]}})
+
+        pipeline += [
+            {"$sort": {"distance": ASCENDING, "_id": ASCENDING}},
+            {"$limit": per_page + 1},
+            {"$project": {"opening_hours": 0, "admin_notes": 0}}
+        ]
+        restaurants = list(mongo.db.restaurants.aggregate(pipeline))
+
+        has_more = len(restaurants) > per_page
+        restaurants = restaurants[:per_page]
+        return jsonify({
+            "data": json.loads(dumps(restaurants)),
+            "per_page": per_page,
+            "has_more": has_more,
+            "next_cursor": encode_cursor(restaurants[-1]["distance"], restaurants[-1]["_id"]) if has_more else None
+        }), 200
+
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
+    except (KeyError, ValueError):
+        return jsonify({"error": "lat and lng parameters required"}), 400
+    except Exception as e:
+        app.logger.error(f"Nearby search error: {str(e)}")
+        return jsonify({"error": "Search failed"}), 500
+
+MAX_SEARCH_WINDOW_SLOTS = 4
+FIND_TABLE_BATCH_SIZE = 200
+
+@app.route("/api/find-table", methods=["GET"])
+def find_table():
+    try:
+        page, per_page = get_pagination_params()
+        party_size = int(request.args.get("party_size", 2))
+        window = min(max(0, int(request.args.get("window", 2))), MAX_SEARCH_WINDOW_SLOTS)
+        datetime_str = request.args.get("datetime")
+        if not datetime_str:
+            abort(400, "datetime parameter required")
+        if party_size <= 0:
+            abort(400, "Invalid party size")
+
+        # Naive times mean wall-clock time at each restaurant ("20:00 tonight")
+        requested = datetime.fromisoformat(datetime_str.replace('Z', '+00:00'))
+
+        query = {"status": "approved", "capacity": {"$gte": party_size}}
+        if request.args.get("city"):
+            query["city"] = bleach.clean(request.args["city"]).strip()
+        if request.args.get("cuisine"):
+            query["cuisine"] = bleach.clean(request.args["cuisine"]).strip()
+
+        projection = {
+            "name": 1, "address": 1, "city": 1, "cuisine": 1, "images": 1,
+            "capacity": 1, "timezone": 1, "opening_hours": 1, "updated_at": 1
+        }
+        now_utc = datetime.now(timezone.utc)
+        skip = (page - 1) * per_page
+        matches = []
+
+        candidates = mongo.db.restaurants.find(query, projection) \
+            .collation(CASE_INSENSITIVE_COLLATION) \
+            .sort("_id", ASCENDING) \
+            .batch_size(FIND_TABLE_BATCH_SIZE)
+
+        batch = []
+        for restaurant in candidates:
+            batch.append(restaurant)
+            if len(batch) < FIND_TABLE_BATCH_SIZE:
+                continue
+            matches.extend(match_open_tables(batch, requested, party_size, window, now_utc))
+            batch = []
+            if len(matches) > skip + per_page:
+                break
+        else:
+            if batch:
+                matches.extend(match_open_tables(batch, requested, party_size, window, now_utc))
+
+        has_more = len(matches) > skip + per_page
+        return jsonify({
+            "data": matches[skip:skip + per_page],
+            "page": page,
+            "per_page": per_page,
+            "has_more": has_more
+        }), 200
+
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
+    except ValueError:
+        return jsonify({"error": "Invalid search parameters"}), 400
+    except Exception as e:
+        app.logger.error(f"Find table error: {str(e)}")
+        return jsonify({"error": "Search failed"}), 500
+
+
+def match_open_tables(restaurants, requested, party_size, window, now_utc):
+    """Return restaurants with a free slot near the requested time, using one aggregation"""
+    wanted = {}
+    reach = SLOT_DURATION * window
+    for restaurant in restaurants:
+        schedule = get_restaurant_schedule(restaurant)
+        if requested.tzinfo is None:
+            center = schedule.tz.localize(requested).astimezone(timezone.utc)
+        else:
+            center = requested.astimezone(timezone.utc)
+
+        # Today's service plus last night's, in case it runs past midnight
+        service_date = center.astimezone(schedule.tz).date()
+        open_slots = schedule.slots_for_date(service_date - timedelta(days=1)) + \
+            schedule.slots_for_date(service_date)
+        candidates = [
+            slot for slot in open_slots
+            if slot >= now_utc and -reach - SLOT_DURATION < slot - center <= reach
+        ]
+        if candidates:
+            wanted[restaurant["_id"]] = (restaurant, center, candidates)
+
+    if not wanted:
+        return []
+
+    all_slots = [slot for _, _, slots in wanted.values() for slot in slots]
+    covers = fetch_slot_covers(
+        [restaurant for restaurant, _, _ in wanted.values()], min(all_slots), max(all_slots) + SLOT_DURATION
+    )
+
+    results = []
+    for restaurant_id, (restaurant, center, slots) in wanted.items():
+        states = build_slot_availability(restaurant, slots, covers, party_size)
+        free = [
+            (abs(slot - center), state["start"])
+            for slot, state in zip(slots, states) if state["available"]
+        ]
+        if not free:
+            continue
+        results.append({
+            "restaurant": json.loads(dumps({
+                key: value for key, value in restaurant.items()
+                if key not in ("opening_hours", "capacity", "updated_at")
+            })),
+            "available_slots": [start for _, start in sorted(free)]
+        })
+    return results
+
 @app.route("/api/my-restaurants", methods=["GET"])
 @jwt_required()
 def get_my_restaurants():
@@ -836,7 +2353,6 @@ def get_my_restaurants():
         if user["role"] not in ["Restaurant Owner", "Admin"]:
             abort(403, "Requires restaurant owner privileges")
 
-        page, per_page = get_pagination_params()
         status_filter = request.args.get("status")
 
         # Get status counts
@@ -855,25 +2371,18 @@ def get_my_restaurants():
             query["status"] = status_filter
 
         # Get paginated results
-        total = mongo.db.restaurants.count_documents(query)
-        restaurants = list(mongo.db.restaurants.find(query)
-            .sort("created_at", DESCENDING)
-            .skip((page-1)*per_page)
-            .limit(per_page))
+        restaurants, pagination = paginate(mongo.db.restaurants, query, "created_at", DESCENDING)
 
         return jsonify({
             "data": {
                 "restaurants": json.loads(dumps(restaurants)),
                 "status_counts": status_counts
             },
-            "pagination": {
-                "total": total,
-                "page": page,
-                "per_page": per_page,
-                "total_pages": (total + per_page - 1) // per_page
-            }
+            "pagination": pagination
         }), 200
 
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
     except Exception as e:
         app.logger.error(f"Error fetching restaurants: {str(e)}")
         return jsonify({"error": "Failed to retrieve restaurants"}), 500        
@@ -921,6 +2430,16 @@ def update_restaurant(id):
                 
             updates['images'] = existing_images + new_images
 
+        if 'price_range' in data:
+            if data['price_range'] not in PRICE_BANDS:
+                return jsonify({"error": "price_range must be between 1-4"}), 400
+            updates['price_range'] = data['price_range']
+
+        if data.get('location') is not None:
+            location = parse_location(data['location'])
+            if not location:
+                return jsonify({"error": "Invalid location"}), 400
+            updates['location'] = location
 
         
         if user["role"] != "Admin":
@@ -931,6 +2450,12 @@ def update_restaurant(id):
             {"_id": ObjectId(id)},
             {"$set": updates}
         )
+        invalidate_restaurant_schedule(id)
+        invalidate_availability(id)
+        # Dish search results embed the restaurant's name and approval
+        invalidate_responses("restaurants", f"restaurant:{id}", "menu:", f"menu:{id}")
+        autocomplete_index.refresh_async()
+        facet_cache.clear()
         return jsonify({"message": "Restaurant updated"}), 200
     except Exception as e:
         app.logger.error(f"Update error: {str(e)}")
@@ -958,8 +2483,7 @@ def delete_restaurant(id):
              )
 
         for image_id in restaurant.get('images', []):
-            if fs.exists(image_id):
-               fs.delete(image_id)
+            delete_image(image_id)
 
         if not restaurant:
             return jsonify({"error": "Restaurant not found"}), 404
@@ -971,13 +2495,25 @@ def delete_restaurant(id):
         # Delete menu item images
         menu_items = mongo.db.menu_items.find({"restaurant_id": ObjectId(id)})
         for item in menu_items:
-            if item.get("image") and fs.exists(item["image"]):
-                fs.delete(item["image"])
+            if item.get("image"):
+                delete_image(item["image"])
 
         # Cascade delete related data
         mongo.db.menu_items.delete_many({"restaurant_id": ObjectId(id)})
         mongo.db.reservations.delete_many({"restaurant_id": ObjectId(id)})
         mongo.db.reviews.delete_many({"restaurant_id": ObjectId(id)})
+        mongo.db.slot_occupancy.delete_many({"restaurant_id": ObjectId(id)})
+        mongo.db.reservation_rollups.delete_many({"restaurant_id": ObjectId(id)})
+        mongo.db.saved_restaurants.delete_many({"restaurant_id": ObjectId(id)})
+        mongo.db.menu_snapshots.delete_one({"_id": ObjectId(id)})
+        mongo.db.menu_snapshot_history.delete_many({"restaurant_id": ObjectId(id)})
+        invalidate_restaurant_schedule(id)
+        invalidate_availability(id)
+        invalidate_responses(
+            "restaurants", f"restaurant:{id}", "menu:", f"menu:{id}", "reviews:", f"reviews:{id}"
+        )
+        autocomplete_index.refresh_async()
+        facet_cache.clear()
        
         
 
@@ -991,59 +2527,323 @@ def delete_restaurant(id):
         target_type="restaurant",
         target_id=id
     )
-        
-        return jsonify({"message": "Restaurant and related data deleted"}), 200
-    except Exception as e:
-        app.logger.error(f"Delete error: {str(e)}")
-        return jsonify({"error": "Deletion failed"}), 500
+        
+        return jsonify({"message": "Restaurant and related data deleted"}), 200
+    except Exception as e:
+        app.logger.error(f"Delete error: {str(e)}")
+        return jsonify({"error": "Deletion failed"}), 500
+
+# Reservation Routes
+def get_reservation_scope(user):
+    """Base reservations query limited to what the user's role may see"""
+    if user["role"] == "Customer":
+        return {"user_id": user["_id"]}
+    if user["role"] == "Restaurant Owner":
+        # Denormalized owner_id keeps the owner feed a single indexed range scan
+        return {"owner_id": user["_id"]}
+    if user["role"] == "Admin":
+        return {}
+    abort(403, "Unauthorized")
+
+
+def build_reservation_query(user):
+    """Role scope plus the restaurant/status/date filters from the request"""
+    query = get_reservation_scope(user)
+
+    # Optional feed filters
+    if request.args.get("restaurant_id"):
+        query["restaurant_id"] = ObjectId(request.args["restaurant_id"])
+    if request.args.get("status"):
+        query["status"] = request.args["status"]
+
+    # Date filtering
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    if start_date and end_date:
+        try:
+            start_utc = datetime.fromisoformat(start_date.replace('Z', '+00:00')).astimezone(timezone.utc)
+            end_utc = datetime.fromisoformat(end_date.replace('Z', '+00:00')).astimezone(timezone.utc)
+            query['datetime'] = {'$gte': start_utc, '$lte': end_utc}
+        except ValueError:
+            abort(400, "Invalid date format")
+    return query
+
+
+@app.cli.command("backfill-reservation-owners")
+def backfill_reservation_owners():
+    """Copy each restaurant's owner_id onto its reservations"""
+    updated = 0
+    for restaurant in mongo.db.restaurants.find({}, {"owner_id": 1}):
+        result = mongo.db.reservations.update_many(
+            {"restaurant_id": restaurant["_id"], "owner_id": {"$ne": restaurant["owner_id"]}},
+            {"$set": {"owner_id": restaurant["owner_id"]}}
+        )
+        updated += result.modified_count
+    click.echo(f"Backfilled owner_id on {updated} reservations")
+
+@app.route("/api/reservations", methods=["GET"])
+@jwt_required()
+def get_reservations():
+    try:
+        user_id = ObjectId(get_jwt_identity())
+        user = mongo.db.users.find_one({"_id": user_id})
+        
+        query = build_reservation_query(user)
+
+        reservations, pagination = paginate(mongo.db.reservations, query, 'datetime', ASCENDING)
+
+        return jsonify({
+            'data': json.loads(dumps(reservations)),
+            'pagination': pagination
+        }), 200
+    except PyMongoError as e:
+        app.logger.error(f"Reservations error: {str(e)}")
+        abort(500, "Failed to retrieve reservations")
+
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_FIELDS = ["id", "restaurant_id", "restaurant_name", "user_id", "party_size",
+                 "datetime", "status", "created_at"]
+
+
+def export_row(reservation, restaurant_names):
+    """Flatten a reservation into plain export values"""
+    return {
+        "id": str(reservation["_id"]),
+        "restaurant_id": str(reservation["restaurant_id"]),
+        "restaurant_name": restaurant_names.get(reservation["restaurant_id"], ""),
+        "user_id": str(reservation.get("user_id", "")),
+        "party_size": reservation.get("party_size"),
+        "datetime": to_utc(reservation["datetime"]).isoformat() if reservation.get("datetime") else "",
+        "status": reservation.get("status", ""),
+        "created_at": to_utc(reservation["created_at"]).isoformat() if reservation.get("created_at") else ""
+    }
+
+
+@app.route("/api/reservations/export", methods=["GET"])
+@limiter.limit("10/minute")
+@jwt_required()
+def export_reservations():
+    try:
+        user = mongo.db.users.find_one({"_id": ObjectId(get_jwt_identity())})
+        export_format = request.args.get("format", "csv").lower()
+        if export_format not in ("csv", "ndjson"):
+            abort(400, "Format must be csv or ndjson")
+        include_names = request.args.get("include_restaurant", "true").lower() == "true"
+
+        query = build_reservation_query(user)
+        cursor = mongo.db.reservations.find(query, {
+            "restaurant_id": 1, "user_id": 1, "party_size": 1,
+            "datetime": 1, "status": 1, "created_at": 1
+        }).sort([("datetime", ASCENDING), ("_id", ASCENDING)]).batch_size(EXPORT_BATCH_SIZE)
+
+        def generate():
+            restaurant_names = {}
+            if export_format == "csv":
+                buffer = io.StringIO()
+                writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+                writer.writeheader()
+                yield buffer.getvalue()
+
+            while True:
+                batch = list(itertools.islice(cursor, EXPORT_BATCH_SIZE))
+                if not batch:
+                    break
+
+                # One lookup per batch for restaurants not seen yet
+                if include_names:
+                    missing = {r["restaurant_id"] for r in batch} - restaurant_names.keys()
+                    if missing:
+                        for restaurant in mongo.db.restaurants.find({"_id": {"$in": list(missing)}}, {"name": 1}):
+                            restaurant_names[restaurant["_id"]] = restaurant["name"]
+                        restaurant_names.update({rid: "" for rid in missing - restaurant_names.keys()})
+
+                rows = [export_row(reservation, restaurant_names) for reservation in batch]
+                if export_format == "csv":
+                    buffer = io.StringIO()
+                    csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS).writerows(rows)
+                    yield buffer.getvalue()
+                else:
+                    yield "".join(json.dumps(row) + "\n" for row in rows)
+
+        filename = f"reservations-{datetime.now(timezone.utc):%Y%m%d}.{export_format}"
+        return Response(
+            stream_with_context(generate()),
+            mimetype="text/csv" if export_format == "csv" else "application/x-ndjson",
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
+    except Exception as e:
+        app.logger.error(f"Reservation export error: {str(e)}")
+        return jsonify({"error": "Export failed"}), 500
+
+
+# ========================
+# Slot Occupancy Counters
+# ========================
+def get_reservation_slot_start(restaurant, datetime_utc):
+    """Abort unless the restaurant is open at the given time; returns the slot start"""
+    slot_start = get_restaurant_schedule(restaurant).slot_for(datetime_utc)
+    if slot_start is None:
+        abort(400, "Restaurant is closed at this time")
+    return slot_start
+
+
+def seed_slot_counter(restaurant, slot_start):
+    """Create a missing slot counter from the reservations already in that slot"""
+    key = {"restaurant_id": restaurant["_id"], "slot_start": slot_start}
+    if mongo.db.slot_occupancy.find_one(key, {"_id": 1}):
+        return
+    covers = fetch_slot_covers([restaurant], slot_start, slot_start + SLOT_DURATION)
+    try:
+        mongo.db.slot_occupancy.insert_one({
+            **key,
+            "covers": covers.get((restaurant["_id"], slot_start), 0),
+            "updated_at": datetime.now(timezone.utc)
+        })
+    except DuplicateKeyError:
+        # Another request seeded it first; its count is just as current
+        pass
+
+
+def reserve_slot_capacity(restaurant, slot_start, party_size):
+    """Atomically add covers to a slot if it stays within capacity"""
+    capacity = restaurant["capacity"]
+    if party_size > capacity:
+        return False
+    # Counters are created lazily, so the first booking of a slot counts the
+    # reservations made before counters existed instead of starting from zero
+    seed_slot_counter(restaurant, slot_start)
+    # The filter only matches while there is room
+    result = mongo.db.slot_occupancy.update_one(
+        {
+            "restaurant_id": restaurant["_id"],
+            "slot_start": slot_start,
+            "covers": {"$lte": capacity - party_size}
+        },
+        {
+            "$inc": {"covers": party_size},
+            "$set": {"updated_at": datetime.now(timezone.utc)}
+        }
+    )
+    return result.matched_count == 1
+
+
+def release_slot_capacity(restaurant_id, slot_start, party_size):
+    """Give covers back to a slot after a cancellation or reschedule"""
+    mongo.db.slot_occupancy.update_one(
+        {
+            "restaurant_id": restaurant_id,
+            "slot_start": slot_start,
+            "covers": {"$gte": party_size}
+        },
+        {
+            "$inc": {"covers": -party_size},
+            "$set": {"updated_at": datetime.now(timezone.utc)}
+        }
+    )
+
+
+def purge_user_reservations(user_id):
+    """Delete a user's reservations, returning their covers to the slot counters
+    and taking them out of the availability cache and rollups"""
+    reservations = list(mongo.db.reservations.find({"user_id": user_id}))
+    restaurants = {
+        r["_id"]: r for r in mongo.db.restaurants.find(
+            {"_id": {"$in": list({reservation["restaurant_id"] for reservation in reservations})}}
+        )
+    }
+    for reservation in reservations:
+        # Per document, so a reservation changed meanwhile is only undone once
+        if not mongo.db.reservations.delete_one({"_id": reservation["_id"]}).deleted_count:
+            continue
+        restaurant = restaurants.get(reservation["restaurant_id"])
+        if not restaurant:
+            continue
+        active = reservation.get("status") not in INACTIVE_RESERVATION_STATUSES
+        slot_start = get_reservation_slot(reservation, restaurant)
+        if active:
+            release_slot_capacity(restaurant["_id"], slot_start, reservation["party_size"])
+            invalidate_availability(restaurant["_id"], get_local_date(restaurant, slot_start))
+        update_reservation_rollups(restaurant, old=(slot_start, reservation["party_size"], active))
+    return len(reservations)
+
+
+def get_local_date(restaurant, dt_utc):
+    """Service date a UTC instant belongs to in the restaurant's timezone"""
+    return get_restaurant_schedule(restaurant).service_date(dt_utc)
+
+
+def get_reservation_slot(reservation, restaurant):
+    """Slot start of an existing reservation (older documents lack slot_start)"""
+    if reservation.get("slot_start"):
+        return to_utc(reservation["slot_start"])
+    datetime_utc = to_utc(reservation["datetime"])
+    return get_restaurant_schedule(restaurant).slot_for(datetime_utc) or datetime_utc.replace(
+        minute=datetime_utc.minute // SLOT_MINUTES * SLOT_MINUTES, second=0, microsecond=0
+    )
 
-# Reservation Routes
-@app.route("/api/reservations", methods=["GET"])
-@jwt_required()
-def get_reservations():
-    try:
-        page, per_page = get_pagination_params()
-        user_id = ObjectId(get_jwt_identity())
-        user = mongo.db.users.find_one({"_id": user_id})
-        
-        query = {}
-        if user["role"] == "Customer":
-            query["user_id"] = user_id
-        elif user["role"] == "Restaurant Owner":
-            restaurants = list(mongo.db.restaurants.find({"owner_id": user_id}))
-            query["restaurant_id"] = {"$in": [r["_id"] for r in restaurants]}
-        elif user["role"] != "Admin":
-            abort(403, "Unauthorized")
-
-        # Date filtering
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        if start_date and end_date:
-            try:
-                start_utc = datetime.fromisoformat(start_date.replace('Z', '+00:00')).astimezone(timezone.utc)
-                end_utc = datetime.fromisoformat(end_date.replace('Z', '+00:00')).astimezone(timezone.utc)
-                query['datetime'] = {'$gte': start_utc, '$lte': end_utc}
-            except ValueError:
-                abort(400, "Invalid date format")
-
-        total = mongo.db.reservations.count_documents(query)
-        reservations = list(mongo.db.reservations.find(query)
-                          .sort('datetime', ASCENDING)
-                          .skip((page-1)*per_page)
-                          .limit(per_page))
 
-        return jsonify({
-            'data': json.loads(dumps(reservations)),
-            'pagination': {
-                'total': total,
-                'page': page,
-                'per_page': per_page,
-                'total_pages': (total + per_page - 1) // per_page
-            }
-        }), 200
-    except PyMongoError as e:
-        app.logger.error(f"Reservations error: {str(e)}")
-        abort(500, "Failed to retrieve reservations")
+@app.cli.command("rebuild-slot-occupancy")
+@click.option("--since", default=None, help="Only rebuild slots starting at or after this ISO date (default: now)")
+def rebuild_slot_occupancy(since):
+    """Recompute slot_occupancy counters from the reservations collection.
+
+    Missing counters are seeded on first booking; this repairs drifted ones.
+    Counts come from a snapshot of reservations, so a booking made while it
+    runs can be overwritten: run it in a maintenance window with bookings paused.
+    """
+    since_utc = to_utc(datetime.fromisoformat(since)) if since else datetime.now(timezone.utc)
+    restaurants = {
+        r["_id"]: r for r in mongo.db.restaurants.find(
+            {}, {"timezone": 1, "opening_hours": 1, "capacity": 1, "updated_at": 1}
+        )
+    }
+
+    expected = {}
+    for reservation in mongo.db.reservations.find(
+        {
+            "datetime": {"$gte": since_utc},
+            "status": {"$nin": INACTIVE_RESERVATION_STATUSES}
+        },
+        {"restaurant_id": 1, "datetime": 1, "slot_start": 1, "party_size": 1}
+    ):
+        restaurant = restaurants.get(reservation["restaurant_id"])
+        if not restaurant:
+            continue
+        slot_start = get_reservation_slot(reservation, restaurant)
+        if slot_start < since_utc:
+            continue
+        key = (reservation["restaurant_id"], slot_start)
+        expected[key] = expected.get(key, 0) + reservation["party_size"]
+
+    corrected = 0
+    for counter in mongo.db.slot_occupancy.find({"slot_start": {"$gte": since_utc}}):
+        key = (counter["restaurant_id"], to_utc(counter["slot_start"]))
+        covers = expected.pop(key, 0)
+        if counter["covers"] != covers:
+            # Skip counters that moved since they were read
+            mongo.db.slot_occupancy.update_one(
+                {"_id": counter["_id"], "covers": counter["covers"]},
+                {"$set": {"covers": covers, "updated_at": datetime.now(timezone.utc)}}
+            )
+            corrected += 1
+
+    # Slots with reservations but no counter document yet
+    if expected:
+        mongo.db.slot_occupancy.bulk_write([
+            UpdateOne(
+                {"restaurant_id": restaurant_id, "slot_start": slot_start},
+                {"$set": {"covers": covers, "updated_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+            for (restaurant_id, slot_start), covers in expected.items()
+        ], ordered=False)
+        corrected += len(expected)
+
+    click.echo(f"Slot occupancy rebuilt: {corrected} counters corrected")
 
 
 @app.route("/api/reservations", methods=["POST"])
@@ -1051,95 +2851,57 @@ def get_reservations():
 def create_reservation():
     try:
         data = request.get_json()
-        datetime_utc = datetime.fromisoformat(data["datetime"].replace('Z', '+00:00')).astimezone(timezone.utc)
-        
+
         # Validate reservation parameters
-        if not validate_future_datetime(data["datetime"]):
-            abort(400, "Reservation must be in the future")
         if not validate_datetime(data["datetime"]):
             abort(400, "Invalid datetime format")
+        if not validate_future_datetime(data["datetime"]):
+            abort(400, "Reservation must be in the future")
 
+        datetime_utc = datetime.fromisoformat(data["datetime"].replace('Z', '+00:00')).astimezone(timezone.utc)
         restaurant_id = ObjectId(data["restaurant_id"])
         party_size = int(data["party_size"])
-        
+
         # Validate party size
         if party_size <= 0:
             abort(400, "Invalid party size")
 
-        with mongo.client.start_session() as session:
-            with session.start_transaction():
-                # Get restaurant with capacity check
-                restaurant = mongo.db.restaurants.find_one(
-                    {"_id": restaurant_id, "status": "approved"},
-                    session=session
-                )
-                if not restaurant:
-                    abort(400, "Restaurant not available")
+        restaurant = mongo.db.restaurants.find_one({"_id": restaurant_id, "status": "approved"})
+        if not restaurant:
+            abort(400, "Restaurant not available")
 
-                if party_size > restaurant["capacity"]:
-                    abort(400, "Party size exceeds restaurant capacity")
+        if party_size > restaurant["capacity"]:
+            abort(400, "Party size exceeds restaurant capacity")
 
-                # Convert to restaurant's local time
-                local_tz = pytz.timezone(restaurant["timezone"])
-                local_time = datetime_utc.astimezone(local_tz)
-                day_of_week = local_time.strftime("%A").lower()
-                
-                try:
-                    opening = restaurant["opening_hours"][day_of_week]
-                except KeyError:
-                    abort(400, "Restaurant is closed on this day")
-
-                # Time validation
-                open_time = datetime.strptime(opening["open"], "%H:%M").time()
-                close_time = datetime.strptime(opening["close"], "%H:%M").time()
-                if not (open_time <= local_time.time() < close_time):
-                    abort(400, "Restaurant is closed at this time")
-
-                # Calculate time slot with transaction
-                slot_start = local_time.replace(second=0, microsecond=0)
-                if local_time.minute >= 30:
-                    slot_start = slot_start.replace(minute=30)
-                else:
-                    slot_start = slot_start.replace(minute=0)
+        slot_start = get_reservation_slot_start(restaurant, datetime_utc)
 
-                slot_end = slot_start + timedelta(minutes=30)
-                
-                # Get total reservations in slot with party sizes
-                pipeline = [
-                    {"$match": {
-                        "restaurant_id": restaurant_id,
-                        "datetime": {
-                            "$gte": slot_start.astimezone(timezone.utc),
-                            "$lt": slot_end.astimezone(timezone.utc)
-                        }
-                    }},
-                    {"$group": {
-                        "_id": None,
-                        "total_people": {"$sum": "$party_size"}
-                    }}
-                ]
-                result = list(mongo.db.reservations.aggregate(pipeline, session=session))
-                total_people = result[0]["total_people"] if result else 0
-
-                if (total_people + party_size) > restaurant["capacity"]:
-                    abort(400, "Not enough capacity for this time slot")
+        # Claim capacity with a single conditional write on the slot counter
+        if not reserve_slot_capacity(restaurant, slot_start, party_size):
+            abort(400, "Not enough capacity for this time slot")
 
-                # Create reservation
-                reservation = {
-                    "user_id": ObjectId(get_jwt_identity()),
-                    "restaurant_id": restaurant_id,
-                    "party_size": party_size,
-                    "datetime": datetime_utc,
-                    "status": "confirmed",
-                    "created_at": datetime.now(timezone.utc)
-                }
-                result = mongo.db.reservations.insert_one(reservation, session=session)
-                session.commit_transaction()
+        reservation = {
+            "user_id": ObjectId(get_jwt_identity()),
+            "restaurant_id": restaurant_id,
+            "owner_id": restaurant["owner_id"],
+            "party_size": party_size,
+            "datetime": datetime_utc,
+            "slot_start": slot_start,
+            "status": "confirmed",
+            "created_at": datetime.now(timezone.utc)
+        }
+        try:
+            result = mongo.db.reservations.insert_one(reservation)
+        except PyMongoError:
+            release_slot_capacity(restaurant_id, slot_start, party_size)
+            raise
+        invalidate_availability(restaurant_id, get_local_date(restaurant, slot_start))
+        update_reservation_rollups(restaurant, new=(slot_start, party_size, True))
 
         return jsonify({"id": str(result.inserted_id)}), 201
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
     except PyMongoError as e:
-        session.abort_transaction()
-        app.logger.error(f"Reservation transaction error: {str(e)}")
+        app.logger.error(f"Reservation database error: {str(e)}")
         return jsonify({"error": "Reservation failed"}), 500
     except Exception as e:
         app.logger.error(f"Reservation error: {str(e)}")
@@ -1155,66 +2917,455 @@ def manage_reservation(id):
 
         user_id = ObjectId(get_jwt_identity())
         user = mongo.db.users.find_one({"_id": user_id})
-        
+        restaurant = mongo.db.restaurants.find_one({"_id": reservation["restaurant_id"]})
+
         # Authorization check
-        is_owner = mongo.db.restaurants.find_one({
-            "_id": reservation["restaurant_id"],
-            "owner_id": user_id
-        })
-        
-        
+        is_owner = restaurant and restaurant["owner_id"] == user_id
+
         if reservation["user_id"] != user_id and not is_owner and user["role"] != "Admin":
             return jsonify({"error": "Unauthorized"}), 403
 
+        was_active = reservation.get("status") not in INACTIVE_RESERVATION_STATUSES
+        old_slot = get_reservation_slot(reservation, restaurant) if restaurant else None
+        old_size = reservation["party_size"]
+
         if request.method == "PUT":
             data = request.get_json()
             updates = {}
 
-
+            new_datetime = to_utc(reservation["datetime"])
             if "datetime" in data:
-             updates["datetime"] = datetime.fromisoformat(
-               data["datetime"].replace('Z', '+00:00')
-                 ).astimezone(timezone.utc)
-             
-             if "datetime" in data:
                 if not validate_future_datetime(data["datetime"]):
-                 abort(400, "Reservation must be in the future")
+                    abort(400, "Reservation must be in the future")
+                new_datetime = datetime.fromisoformat(
+                    data["datetime"].replace('Z', '+00:00')
+                ).astimezone(timezone.utc)
+                updates["datetime"] = new_datetime
 
+            new_size = old_size
             if "party_size" in data:
-                updates["party_size"] = int(data["party_size"])
+                new_size = int(data["party_size"])
+                if new_size <= 0:
+                    abort(400, "Invalid party size")
+                updates["party_size"] = new_size
+
+            new_status = reservation.get("status")
             if "status" in data and user["role"] in ["Restaurant Owner", "Admin"]:
-                updates["status"] = data["status"]
-            
+                new_status = data["status"]
+                updates["status"] = new_status
+
+            will_be_active = new_status not in INACTIVE_RESERVATION_STATUSES
+            new_slot = old_slot
+            if will_be_active and restaurant and ("datetime" in data or "party_size" in data):
+                new_slot = get_reservation_slot_start(restaurant, new_datetime)
+                updates["slot_start"] = new_slot
+
+            # Move covers between slot counters before committing the change
+            claimed = None
+            if will_be_active and restaurant:
+                if not was_active or new_slot != old_slot:
+                    claimed = (new_slot, new_size)
+                elif new_size > old_size:
+                    claimed = (new_slot, new_size - old_size)
+                if claimed and not reserve_slot_capacity(restaurant, claimed[0], claimed[1]):
+                    abort(400, "Not enough capacity for this time slot")
+
             updates["updated_at"] = datetime.now(timezone.utc)
-            mongo.db.reservations.update_one(
-                {"_id": ObjectId(id)},
+            # Only apply if nobody changed the reservation since we read it
+            result = mongo.db.reservations.update_one(
+                {
+                    "_id": ObjectId(id),
+                    "datetime": reservation["datetime"],
+                    "party_size": old_size,
+                    "status": reservation.get("status")
+                },
                 {"$set": updates}
             )
+            if result.modified_count == 0:
+                if claimed:
+                    release_slot_capacity(restaurant["_id"], claimed[0], claimed[1])
+                return jsonify({"error": "Reservation was modified concurrently"}), 409
+
+            if was_active and restaurant:
+                if not will_be_active or new_slot != old_slot:
+                    release_slot_capacity(restaurant["_id"], old_slot, old_size)
+                elif new_size < old_size:
+                    release_slot_capacity(restaurant["_id"], old_slot, old_size - new_size)
+
+            if restaurant:
+                invalidate_availability(
+                    restaurant["_id"],
+                    *{get_local_date(restaurant, old_slot), get_local_date(restaurant, new_slot)}
+                )
+                update_reservation_rollups(
+                    restaurant,
+                    old=(old_slot, old_size, was_active),
+                    new=(new_slot, new_size, will_be_active)
+                )
+
             return jsonify({"message": "Reservation updated"}), 200
 
         elif request.method == "DELETE":
             new_status = "canceled" if user["role"] == "Customer" else "rejected"
-            mongo.db.reservations.update_one(
-                {"_id": ObjectId(id)},
+            result = mongo.db.reservations.update_one(
+                {"_id": ObjectId(id), "status": reservation.get("status")},
                 {"$set": {
                     "status": new_status,
                     "updated_at": datetime.now(timezone.utc)
                 }}
             )
+            if result.modified_count == 1 and was_active and restaurant:
+                release_slot_capacity(restaurant["_id"], old_slot, old_size)
+                invalidate_availability(restaurant["_id"], get_local_date(restaurant, old_slot))
+                update_reservation_rollups(
+                    restaurant,
+                    old=(old_slot, old_size, True),
+                    new=(old_slot, old_size, False)
+                )
             return jsonify({"message": "Reservation canceled"}), 200
 
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
     except Exception as e:
         app.logger.error(f"Reservation error: {str(e)}")
         return jsonify({"error": "Operation failed"}), 500
 
+# ========================
+# Owner Analytics Rollups
+# ========================
+MAX_ANALYTICS_DAYS = 366
+
+
+def get_rollup_periods(restaurant, slot_start):
+    """Local wall-clock hour and service day a slot is rolled up into"""
+    schedule = get_restaurant_schedule(restaurant)
+    hour = slot_start.astimezone(schedule.tz).replace(minute=0, second=0, microsecond=0, tzinfo=None)
+    day = datetime.combine(schedule.service_date(slot_start), datetime.min.time())
+    return hour, day
+
+
+def rollup_contribution(state):
+    """Counters a single reservation state adds to its periods"""
+    slot_start, party_size, active = state
+    return {
+        "bookings": 1,
+        "covers": party_size if active else 0,
+        "cancellations": 0 if active else 1
+    }
+
+
+def update_reservation_rollups(restaurant, old=None, new=None):
+    """Apply the difference between two reservation states to the hourly/daily rollups.
+
+    States are (slot_start, party_size, active) tuples; pass only ``new`` for a
+    fresh booking.
+    """
+    increments = {}
+    for state, sign in ((old, -1), (new, 1)):
+        if state is None:
+            continue
+        for period in zip(("hour", "day"), get_rollup_periods(restaurant, state[0])):
+            counters = increments.setdefault(period, {})
+            for field, value in rollup_contribution(state).items():
+                counters[field] = counters.get(field, 0) + sign * value
+
+    operations = [
+        UpdateOne(
+            {"restaurant_id": restaurant["_id"], "granularity": granularity, "period_start": period_start},
+            {
+                "$inc": {field: value for field, value in counters.items() if value},
+                "$set": {"updated_at": datetime.now(timezone.utc)}
+            },
+            upsert=True
+        )
+        for (granularity, period_start), counters in increments.items()
+        if any(counters.values())
+    ]
+    if not operations:
+        return
+    try:
+        mongo.db.reservation_rollups.bulk_write(operations, ordered=False)
+    except PyMongoError as e:
+        # Rollups are derived data; a rebuild repairs any missed update
+        app.logger.error(f"Rollup update error: {str(e)}")
+
+
+@app.cli.command("rebuild-reservation-rollups")
+@click.option("--restaurant-id", default=None, help="Only rebuild rollups for this restaurant")
+def rebuild_reservation_rollups(restaurant_id):
+    """Recompute hourly/daily reservation rollups from the reservations collection"""
+    query = {"_id": ObjectId(restaurant_id)} if restaurant_id else {}
+    rebuilt = 0
+    for restaurant in mongo.db.restaurants.find(
+        query, {"timezone": 1, "opening_hours": 1, "capacity": 1, "updated_at": 1}
+    ):
+        counters = {}
+        for reservation in mongo.db.reservations.find(
+            {"restaurant_id": restaurant["_id"]},
+            {"datetime": 1, "slot_start": 1, "party_size": 1, "status": 1}
+        ).batch_size(1000):
+            state = (
+                get_reservation_slot(reservation, restaurant),
+                reservation["party_size"],
+                reservation.get("status") not in INACTIVE_RESERVATION_STATUSES
+            )
+            for period in zip(("hour", "day"), get_rollup_periods(restaurant, state[0])):
+                totals = counters.setdefault(period, {"bookings": 0, "covers": 0, "cancellations": 0})
+                for field, value in rollup_contribution(state).items():
+                    totals[field] += value
+
+        mongo.db.reservation_rollups.delete_many({"restaurant_id": restaurant["_id"]})
+        if counters:
+            mongo.db.reservation_rollups.insert_many([
+                {
+                    "restaurant_id": restaurant["_id"],
+                    "granularity": granularity,
+                    "period_start": period_start,
+                    **totals,
+                    "updated_at": datetime.now(timezone.utc)
+                }
+                for (granularity, period_start), totals in counters.items()
+            ])
+        rebuilt += 1
+    click.echo(f"Rebuilt reservation rollups for {rebuilt} restaurants")
+
+
+@app.route("/api/owner/restaurants/<id>/analytics", methods=["GET"])
+@jwt_required()
+def get_restaurant_analytics(id):
+    try:
+        user_id = ObjectId(get_jwt_identity())
+        restaurant = mongo.db.restaurants.find_one({"_id": ObjectId(id)})
+        if not restaurant:
+            abort(404, "Restaurant not found")
+        if restaurant["owner_id"] != user_id:
+            user = mongo.db.users.find_one({"_id": user_id}, {"role": 1})
+            if not user or user.get("role") != "Admin":
+                abort(403, "You don't own this restaurant")
+
+        days = min(max(1, int(request.args.get("days", 90))), MAX_ANALYTICS_DAYS)
+        schedule = get_restaurant_schedule(restaurant)
+        capacity = restaurant["capacity"]
+        end_date = datetime.now(schedule.tz).date()
+        start_date = end_date - timedelta(days=days - 1)
+
+        # One query over the (restaurant_id, granularity, period_start) index
+        rollups = list(mongo.db.reservation_rollups.find({
+            "restaurant_id": restaurant["_id"],
+            "granularity": {"$in": ["hour", "day"]},
+            "period_start": {
+                "$gte": datetime.combine(start_date, datetime.min.time()),
+                "$lt": datetime.combine(end_date + timedelta(days=2), datetime.min.time())
+            }
+        }, {"_id": 0, "granularity": 1, "period_start": 1, "covers": 1, "bookings": 1, "cancellations": 1}))
+
+        daily_rollups = {
+            r["period_start"].date(): r for r in rollups
+            if r["granularity"] == "day" and r["period_start"].date() <= end_date
+        }
+        daily = []
+        totals = {"covers": 0, "bookings": 0, "cancellations": 0}
+        open_slots = 0
+        # Bookable slots per (weekday, hour) across the range, for the heatmap
+        slot_counts = [[0] * 24 for _ in range(7)]
+        current = start_date
+        while current <= end_date:
+            day_slots = schedule.slots_for_date(current)
+            for slot in day_slots:
+                local = slot.astimezone(schedule.tz)
+                slot_counts[local.weekday()][local.hour] += 1
+            rollup = daily_rollups.get(current, {})
+            day_capacity = capacity * len(day_slots)
+            entry = {
+                "date": current.isoformat(),
+                "covers": rollup.get("covers", 0),
+                "bookings": rollup.get("bookings", 0),
+                "cancellations": rollup.get("cancellations", 0),
+                "occupancy_pct": round(100 * rollup.get("covers", 0) / day_capacity, 1) if day_capacity else None
+            }
+            for field in totals:
+                totals[field] += entry[field]
+            open_slots += len(day_slots)
+            daily.append(entry)
+            current += timedelta(days=1)
+
+        heat_covers = [[0] * 24 for _ in range(7)]
+        for rollup in rollups:
+            if rollup["granularity"] == "hour" and start_date <= rollup["period_start"].date() <= end_date + timedelta(days=1):
+                period = rollup["period_start"]
+                heat_covers[period.weekday()][period.hour] += rollup.get("covers", 0)
+        heatmap = [
+            [
+                round(100 * heat_covers[weekday][hour] / (capacity * slot_counts[weekday][hour]), 1)
+                if slot_counts[weekday][hour] else None
+                for hour in range(24)
+            ]
+            for weekday in range(7)
+        ]
+
+        return jsonify({
+            "restaurant_id": id,
+            "timezone": str(schedule.tz),
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "totals": {
+                **totals,
+                "occupancy_pct": round(100 * totals["covers"] / (capacity * open_slots), 1) if open_slots else None
+            },
+            "daily": daily,
+            "heatmap": {"weekdays": [day.capitalize() for day in WEEKDAYS], "occupancy_pct": heatmap}
+        }), 200
+
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
+    except InvalidId:
+        return jsonify({"error": "Invalid ID format"}), 400
+    except ValueError:
+        return jsonify({"error": "Invalid days parameter"}), 400
+    except Exception as e:
+        app.logger.error(f"Analytics error: {str(e)}")
+        return jsonify({"error": "Failed to load analytics"}), 500
+
 # Menu Item Routes
+DEFAULT_MENU_CATEGORY = "Other"
+# Without restaurant_id or q only a fixed first slice is served (flagged by X-Result-Truncated)
+MAX_UNFILTERED_MENU_ITEMS = 50
+# Text matches considered before joining restaurants for the approved check
+MAX_DISH_SEARCH_CANDIDATES = 1000
+MAX_DISH_SEARCH_RESTAURANTS = 500
+
+def group_menu_items(items):
+    """Group consecutive items of a category-sorted page"""
+    groups = []
+    for category, group in itertools.groupby(items, key=lambda item: item.get("category") or DEFAULT_MENU_CATEGORY):
+        groups.append({"category": category, "items": list(group)})
+    return groups
+
+def find_menu_items_by_category(query, projection=None):
+    """Items in (category, _id) order, with a missing category sorted as DEFAULT_MENU_CATEGORY.
+
+    Without this, uncategorised items sort first and still group as "Other",
+    splitting "Other" in two.
+    """
+    pipeline = [
+        {"$match": query},
+        {"$set": {"category": {"$ifNull": ["$category", DEFAULT_MENU_CATEGORY]}}},
+        {"$sort": {"category": ASCENDING, "_id": ASCENDING}}
+    ]
+    if projection:
+        pipeline.append({"$project": projection})
+    return list(mongo.db.menu_items.aggregate(pipeline))
+
+@app.cli.command("backfill-menu-categories")
+def backfill_menu_categories():
+    """Store DEFAULT_MENU_CATEGORY on items without one, so paginated category order matches"""
+    result = mongo.db.menu_items.update_many(
+        {"category": {"$in": [None, ""]}}, {"$set": {"category": DEFAULT_MENU_CATEGORY}}
+    )
+    click.echo(f"Categorised {result.modified_count} menu items")
+
+def search_menu_items(search, projection, restaurant_id=None):
+    """Relevance-ranked $text dish search, limited to approved restaurants"""
+    page, per_page = get_pagination_params()
+    match = {"$text": {"$search": bleach.clean(search)}}
+    if restaurant_id:
+        match["restaurant_id"] = ObjectId(restaurant_id)
+    elif request.args.get("lat") and request.args.get("lng"):
+        point = parse_location({"lat": float(request.args["lat"]), "lng": float(request.args["lng"])})
+        if not point:
+            abort(400, "Invalid coordinates")
+        radius = get_nearby_radius()
+        nearby = mongo.db.restaurants.find(
+            {"status": "approved", "location": {"$geoWithin": {"$centerSphere": [point["coordinates"], radius / 6378100]}}},
+            {"_id": 1}
+        ).limit(MAX_DISH_SEARCH_RESTAURANTS)
+        match["restaurant_id"] = {"$in": [restaurant["_id"] for restaurant in nearby]}
+
+    pipeline = [
+        {"$match": match},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+        {"$sort": {"score": DESCENDING, "_id": ASCENDING}},
+        {"$limit": MAX_DISH_SEARCH_CANDIDATES},
+        {"$lookup": {"from": "restaurants", "localField": "restaurant_id", "foreignField": "_id", "as": "restaurant"}},
+        {"$unwind": "$restaurant"},
+        {"$match": {"restaurant.status": "approved"}},
+        {"$set": {"restaurant": {
+            "_id": "$restaurant._id",
+            "name": "$restaurant.name",
+            "city": "$restaurant.city",
+            "cuisine": "$restaurant.cuisine"
+        }}},
+        {"$skip": (page - 1) * per_page},
+        {"$limit": per_page + 1}
+    ]
+    if projection and 1 in projection.values():
+        pipeline.append({"$project": {**projection, "score": 1, "restaurant": 1}})
+    elif projection:
+        pipeline.append({"$project": projection})
+
+    items = list(mongo.db.menu_items.aggregate(pipeline))
+    return etag_response({
+        'data': json.loads(dumps(items[:per_page])),
+        'pagination': {"page": page, "per_page": per_page, "has_more": len(items) > per_page}
+    })
+
 @app.route("/api/menu-items", methods=["GET"])
+@cached_response("menu", "menu:{restaurant_id}")
 def get_menu_items():
     try:
         restaurant_id = request.args.get("restaurant_id")
-        query = {"restaurant_id": ObjectId(restaurant_id)} if restaurant_id else {}
-        items = list(mongo.db.menu_items.find(query))
-        return jsonify(json.loads(dumps(items))), 200
+        search = request.args.get("q", "").strip()
+        projection = get_projection(MENU_ITEM_FIELDS, MENU_ITEM_SUMMARY_FIELDS)
+
+        if search:
+            return search_menu_items(search, projection, restaurant_id)
+
+        if not restaurant_id:
+            items = list(mongo.db.menu_items.find({}, projection)
+                .sort("_id", ASCENDING)
+                .limit(MAX_UNFILTERED_MENU_ITEMS + 1))
+            response = etag_response(json.loads(dumps(items[:MAX_UNFILTERED_MENU_ITEMS])))
+            if len(items) > MAX_UNFILTERED_MENU_ITEMS:
+                response.headers["X-Result-Truncated"] = "true"
+            return response
+
+        group = request.args.get("group") == "category"
+        paginated = request.args.get("page") is not None or request.args.get("cursor") is not None
+        if not paginated and not request.args.get("fields") and request.args.get("view") != "full":
+            # Unpaginated summary reads are one _id lookup on the pre-rendered snapshot,
+            # returned as a bare array like before pagination existed
+            snapshot = get_menu_snapshot(restaurant_id)
+            menu = json.loads(snapshot["payload"]) if snapshot else {"items": [], "categories": []}
+            etag = make_etag(restaurant_id, snapshot["version"] if snapshot else 0, request.query_string.decode())
+            if request.if_none_match.contains(etag):
+                return not_modified(etag)
+            if group:
+                return etag_response({'data': menu["items"], 'categories': menu["categories"]}, etag)
+            return etag_response(menu["items"], etag)
+
+        query = {"restaurant_id": ObjectId(restaurant_id)}
+        restaurant = mongo.db.restaurants.find_one({"_id": query["restaurant_id"]}, {"menu_version": 1})
+        etag = make_etag(restaurant_id, (restaurant or {}).get("menu_version", 0), request.query_string.decode())
+        if request.if_none_match.contains(etag):
+            return not_modified(etag)
+
+        if not paginated:
+            items = json.loads(dumps(find_menu_items_by_category(query, projection)))
+            if group:
+                return etag_response({'data': items, 'categories': group_menu_items(items)}, etag)
+            return etag_response(items, etag)
+
+        items, pagination = paginate(mongo.db.menu_items, query, "category", ASCENDING, projection=projection)
+        payload = {'data': json.loads(dumps(items)), 'pagination': pagination}
+        if group:
+            payload['categories'] = group_menu_items(payload['data'])
+        return etag_response(payload, etag)
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
+    except InvalidId:
+        return jsonify({"error": "Invalid ID format"}), 400
+    except ValueError:
+        return jsonify({"error": "Invalid coordinates"}), 400
     except Exception as e:
          app.logger.error(f"Error: {str(e)}")
     return jsonify({"error": "Internal server error"}), 500
@@ -1260,13 +3411,17 @@ def create_menu_item():
             "description": bleach.clean(data.get("description", "")).strip(),
             "price": float(data["price"]),
             "image": image_id,
+            "category": bleach.clean(data.get("category") or DEFAULT_MENU_CATEGORY).strip(),
             "restaurant_id": restaurant_id,
             "created_at": datetime.now(timezone.utc)
         }
 
         result = mongo.db.menu_items.insert_one(menu_item)
+        rebuild_menu_snapshot(restaurant_id)
         return jsonify({"id": str(result.inserted_id)}), 201
 
+    except DuplicateKeyError:
+        return jsonify({"error": "A menu item with this name already exists"}), 409
     except PyMongoError as e:
         app.logger.error(f"Menu item database error: {str(e)}")
         return jsonify({"error": "Creation failed"}), 500
@@ -1275,6 +3430,165 @@ def create_menu_item():
         return jsonify({"error": "Creation failed"}), 500
 
 
+MAX_BULK_MENU_ITEMS = 500
+
+def read_bulk_menu_rows():
+    """Rows from an uploaded CSV file, a text/csv body, or a JSON array ({"items": [...]} also accepted)"""
+    upload = request.files.get("file")
+    if upload:
+        return list(csv.DictReader(io.StringIO(upload.read().decode("utf-8-sig"))))
+    if request.mimetype == "text/csv":
+        return list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get("items")
+    if not isinstance(data, list):
+        abort(400, "Expected a JSON array of menu items or a CSV upload")
+    return data
+
+def parse_bulk_menu_row(row):
+    """Validated menu item fields for one import row; raises ValueError with the reason"""
+    if not isinstance(row, dict):
+        raise ValueError("Row must be an object")
+    name = bleach.clean(str(row.get("name") or "")).strip()
+    if not name:
+        raise ValueError("Name is required")
+    if not validate_price(row.get("price")):
+        raise ValueError("Invalid price")
+    image = row.get("image") or None
+    if image and not ObjectId.is_valid(image):
+        raise ValueError("Invalid image ID format")
+    item = {
+        "name": name,
+        "description": bleach.clean(str(row.get("description") or "")).strip(),
+        "price": float(row["price"]),
+        "category": bleach.clean(str(row.get("category") or DEFAULT_MENU_CATEGORY)).strip()
+    }
+    # Rows without an image leave an existing dish's image alone
+    if image:
+        item["image"] = ObjectId(image)
+    return item
+
+@app.route("/api/menu-items/bulk", methods=["POST"])
+@jwt_required()
+def bulk_import_menu_items():
+    """Upsert many menu items by (restaurant, name), reporting errors per row"""
+    try:
+        body = request.get_json(silent=True)
+        raw_id = (request.args.get("restaurant_id") or request.form.get("restaurant_id")
+                  or (body.get("restaurant_id") if isinstance(body, dict) else None))
+        # ObjectId(None) would mint a fresh id rather than fail
+        if not raw_id:
+            abort(400, "Missing restaurant_id")
+        restaurant_id = ObjectId(raw_id)
+
+        # Ownership is verified once for the whole batch
+        restaurant = mongo.db.restaurants.find_one({
+            "_id": restaurant_id,
+            "owner_id": ObjectId(get_jwt_identity()),
+            "status": "approved"
+        }, {"_id": 1})
+        if not restaurant:
+            abort(403, "Invalid restaurant or permissions")
+
+        rows = read_bulk_menu_rows()
+        if not rows:
+            abort(400, "No menu items provided")
+        if len(rows) > MAX_BULK_MENU_ITEMS:
+            abort(400, f"At most {MAX_BULK_MENU_ITEMS} menu items per import")
+
+        errors = []
+        items = {}
+        for index, row in enumerate(rows):
+            try:
+                item = parse_bulk_menu_row(row)
+            except ValueError as e:
+                errors.append({"row": index, "error": str(e)})
+                continue
+            if item["name"] in items:
+                errors.append({"row": index, "error": "Duplicate name in import"})
+                continue
+            items[item["name"]] = (index, item)
+        rows_by_index = dict(items.values())
+
+        # One $in over fs.files instead of a GridFS lookup per row
+        image_ids = [item["image"] for _, item in items.values() if item.get("image")]
+        owned_images = {
+            image["_id"] for image in mongo.db.fs.files.find({
+                "_id": {"$in": image_ids},
+                "metadata.restaurant_id": {"$in": [restaurant_id, str(restaurant_id)]}
+            }, {"_id": 1})
+        } if image_ids else set()
+
+        # Images a row replaces are deleted once its write lands
+        replaced_images = {
+            dish["name"]: dish["image"] for dish in mongo.db.menu_items.find({
+                "restaurant_id": restaurant_id,
+                "name": {"$in": [item["name"] for _, item in items.values() if item.get("image")]},
+                "image": {"$ne": None}
+            }, {"name": 1, "image": 1})
+        } if image_ids else {}
+
+        now = datetime.now(timezone.utc)
+        operations = []
+        operation_rows = []
+        for index, item in items.values():
+            if item.get("image") and item["image"] not in owned_images:
+                errors.append({"row": index, "error": "Image not found for this restaurant"})
+                continue
+            operations.append(UpdateOne(
+                {"restaurant_id": restaurant_id, "name": item["name"]},
+                {
+                    "$set": {**item, "updated_at": now},
+                    "$setOnInsert": {"created_at": now, **({} if "image" in item else {"image": None})}
+                },
+                upsert=True
+            ))
+            operation_rows.append(index)
+
+        inserted = updated = 0
+        failed_rows = set()
+        if operations:
+            try:
+                result = mongo.db.menu_items.bulk_write(operations, ordered=False)
+                inserted, updated = result.upserted_count, result.matched_count
+            except BulkWriteError as bwe:
+                details = bwe.details
+                inserted, updated = details.get("nUpserted", 0), details.get("nMatched", 0)
+                for error in details.get("writeErrors", []):
+                    failed_rows.add(operation_rows[error["index"]])
+                    errors.append({
+                        "row": operation_rows[error["index"]],
+                        "error": "Duplicate dish name" if error.get("code") == 11000 else "Write failed"
+                    })
+            if inserted or updated:
+                rebuild_menu_snapshot(restaurant_id)
+
+            for index in operation_rows:
+                item = rows_by_index[index]
+                old_image = replaced_images.get(item["name"])
+                if index not in failed_rows and old_image and old_image != item.get("image"):
+                    delete_image(old_image)
+
+        errors.sort(key=lambda error: error["row"])
+        status = 400 if errors and not (inserted or updated) else 200
+        return jsonify({"inserted": inserted, "updated": updated, "errors": errors}), status
+
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
+    except (InvalidId, TypeError):
+        return jsonify({"error": "Invalid restaurant ID"}), 400
+    except (UnicodeDecodeError, csv.Error):
+        return jsonify({"error": "Unreadable CSV file"}), 400
+    except PyMongoError as e:
+        app.logger.error(f"Menu import database error: {str(e)}")
+        return jsonify({"error": "Import failed"}), 500
+    except Exception as e:
+        app.logger.error(f"Menu import error: {str(e)}")
+        return jsonify({"error": "Import failed"}), 500
+
+
 @app.route("/api/menu-items/<id>", methods=["PUT"])
 @jwt_required()
 def manage_menu_item(id):
@@ -1295,6 +3609,9 @@ def manage_menu_item(id):
             "name": bleach.clean(data.get("name", menu_item["name"])).strip(),
             "description": bleach.clean(data.get("description", menu_item["description"])).strip(),
             "price": float(data["price"]) if "price" in data else menu_item["price"],
+            "category": bleach.clean(
+                data.get("category") or menu_item.get("category") or DEFAULT_MENU_CATEGORY
+            ).strip(),
             "updated_at": datetime.now(timezone.utc)
         }
         
@@ -1305,15 +3622,17 @@ def manage_menu_item(id):
 
         old_image = menu_item.get("image")
         if old_image and data.get("image") != old_image:
-           if fs.exists(old_image):
-             fs.delete(old_image)     
+           delete_image(old_image)
 
         mongo.db.menu_items.update_one(
             {"_id": ObjectId(id)},
             {"$set": updates}
         )
+        rebuild_menu_snapshot(menu_item["restaurant_id"])
         return jsonify({"message": "Menu item updated"}), 200
 
+    except DuplicateKeyError:
+        return jsonify({"error": "A menu item with this name already exists"}), 409
     except Exception as e:
         app.logger.error(f"Menu item error: {str(e)}")
         return jsonify({"error": "Operation failed"}), 500
@@ -1336,8 +3655,7 @@ def delete_menu_item(id):
             return jsonify({"error": "Unauthorized"}), 403
        
         if menu_item.get("image"):
-         if fs.exists(menu_item["image"]):
-          fs.delete(menu_item["image"])
+         delete_image(menu_item["image"])
        
 
         if request.method == "PUT":
@@ -1354,21 +3672,211 @@ def delete_menu_item(id):
                 {"_id": ObjectId(id)},
                 {"$set": updates}
             )
+            rebuild_menu_snapshot(menu_item["restaurant_id"])
             return jsonify({"message": "Menu item updated"}), 200
 
         elif request.method == "DELETE":
             mongo.db.menu_items.delete_one({"_id": ObjectId(id)})
+            rebuild_menu_snapshot(menu_item["restaurant_id"])
             return jsonify({"message": "Menu item deleted"}), 200
 
     except Exception as e:
         app.logger.error(f"Menu item error: {str(e)}")
         return jsonify({"error": "Operation failed"}), 500
 
+# ========================
+# Menu Snapshots
+# ========================
+# menu_snapshots holds one pre-rendered menu per restaurant (_id = restaurant_id),
+# rebuilt on every menu mutation; menu_snapshot_history keeps recent versions.
+# Reads never write: menus that predate snapshots are rendered on the fly until
+# rebuild-menu-snapshots backfills them
+MAX_MENU_SNAPSHOT_HISTORY = 50
+
+def render_menu_snapshot(restaurant_id, version):
+    """Snapshot document for the restaurant's current items"""
+    built_at = datetime.now(timezone.utc)
+    items = json.loads(dumps(find_menu_items_by_category(
+        {"restaurant_id": restaurant_id}, {field: 1 for field in MENU_ITEM_SUMMARY_FIELDS}
+    )))
+    return {
+        "version": version,
+        "built_at": built_at,
+        "item_count": len(items),
+        "payload": json.dumps({
+            "restaurant_id": str(restaurant_id),
+            "version": version,
+            "built_at": built_at.isoformat(),
+            "items": items,
+            "categories": group_menu_items(items)
+        })
+    }
+
+def rebuild_menu_snapshot(restaurant_id):
+    """Render the restaurant's menu into a new snapshot version"""
+    restaurant_id = ObjectId(restaurant_id)
+    # Taking the version before reading items means the highest version
+    # always reflects every mutation that preceded it
+    restaurant = mongo.db.restaurants.find_one_and_update(
+        {"_id": restaurant_id}, {"$inc": {"menu_version": 1}},
+        projection={"menu_version": 1}, return_document=ReturnDocument.AFTER
+    )
+    invalidate_responses("menu:", f"menu:{restaurant_id}", f"restaurant:{restaurant_id}")
+    if not restaurant:
+        return None
+
+    version = restaurant["menu_version"]
+    snapshot = render_menu_snapshot(restaurant_id, version)
+
+    try:
+        # A concurrent rebuild with a higher version wins; ours then hits the _id
+        mongo.db.menu_snapshots.update_one(
+            {"_id": restaurant_id, "$or": [{"version": {"$lt": version}}, {"version": {"$exists": False}}]},
+            {"$set": snapshot},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        pass
+    mongo.db.menu_snapshot_history.insert_one({"restaurant_id": restaurant_id, **snapshot})
+    mongo.db.menu_snapshot_history.delete_many({
+        "restaurant_id": restaurant_id, "version": {"$lte": version - MAX_MENU_SNAPSHOT_HISTORY}
+    })
+    return {"_id": restaurant_id, **snapshot}
+
+def get_menu_snapshot(restaurant_id):
+    """Current snapshot, or an unstored rendering at the current menu_version if none exists yet"""
+    restaurant_id = ObjectId(restaurant_id)
+    snapshot = mongo.db.menu_snapshots.find_one({"_id": restaurant_id})
+    if snapshot:
+        return snapshot
+    restaurant = mongo.db.restaurants.find_one({"_id": restaurant_id}, {"menu_version": 1})
+    if not restaurant:
+        return None
+    return {"_id": restaurant_id, **render_menu_snapshot(restaurant_id, restaurant.get("menu_version", 0))}
+
+@app.cli.command("rebuild-menu-snapshots")
+@click.option("--missing-only", is_flag=True, help="Only build menus that have no snapshot yet")
+def rebuild_menu_snapshots(missing_only):
+    """Rebuild the menu snapshot of every restaurant"""
+    restaurant_ids = [restaurant["_id"] for restaurant in mongo.db.restaurants.find({}, {"_id": 1})]
+    if missing_only:
+        existing = set(mongo.db.menu_snapshots.distinct("_id", {"_id": {"$in": restaurant_ids}}))
+        restaurant_ids = [rid for rid in restaurant_ids if rid not in existing]
+    rebuilt = sum(1 for rid in restaurant_ids if rebuild_menu_snapshot(rid))
+    click.echo(f"Rebuilt {rebuilt} menu snapshots")
+
+def find_approved_restaurant(id, projection=None):
+    """Approved restaurant or a 404, for public endpoints scoped to one restaurant"""
+    restaurant = mongo.db.restaurants.find_one({"_id": ObjectId(id), "status": "approved"}, projection)
+    if not restaurant:
+        abort(404, "Restaurant not found or not approved")
+    return restaurant
+
+@app.route("/api/restaurants/<id>/menu", methods=["GET"])
+def get_restaurant_menu(id):
+    """Whole menu from its snapshot; ?version=N serves a past version from history"""
+    try:
+        restaurant = find_approved_restaurant(id, {"menu_version": 1})
+        version = request.args.get("version", type=int)
+        if version is not None:
+            snapshot = mongo.db.menu_snapshot_history.find_one({"restaurant_id": restaurant["_id"], "version": version})
+        else:
+            # menu_version answers polling clients without loading the payload
+            etag = make_etag(id, restaurant.get("menu_version", 0))
+            if request.if_none_match.contains(etag):
+                return not_modified(etag)
+            snapshot = get_menu_snapshot(id)
+        if not snapshot:
+            abort(404, "Menu not found")
+
+        response = Response(snapshot["payload"], mimetype="application/json")
+        response.set_etag(make_etag(id, snapshot["version"]))
+        response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
+
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
+    except InvalidId:
+        return jsonify({"error": "Invalid ID format"}), 400
+    except Exception as e:
+        app.logger.error(f"Menu snapshot error: {str(e)}")
+        return jsonify({"error": "Failed to load menu"}), 500
+
+@app.route("/api/restaurants/<id>/menu/history", methods=["GET"])
+def get_restaurant_menu_history(id):
+    try:
+        restaurant = find_approved_restaurant(id, {"_id": 1})
+        versions = mongo.db.menu_snapshot_history.find(
+            {"restaurant_id": restaurant["_id"]}, {"_id": 0, "version": 1, "built_at": 1, "item_count": 1}
+        ).sort("version", DESCENDING)
+        return jsonify(json.loads(dumps(list(versions)))), 200
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
+    except InvalidId:
+        return jsonify({"error": "Invalid ID format"}), 400
+    except Exception as e:
+        app.logger.error(f"Menu history error: {str(e)}")
+        return jsonify({"error": "Failed to load menu history"}), 500
+
+# ========================
+# Rating Aggregates
+# ========================
+# Restaurants carry rating_sum, rating_count, rating_histogram ({"1".."5": n})
+# and rating_avg so lists can sort and filter on rating from an index
+def apply_review_rating(restaurant_id, rating, delta):
+    """Atomically fold one review into (delta=1) or out of (delta=-1) the aggregates"""
+    mongo.db.restaurants.update_one({"_id": restaurant_id}, [
+        {"$set": {
+            "rating_sum": {"$add": [{"$ifNull": ["$rating_sum", 0]}, delta * rating]},
+            "rating_count": {"$add": [{"$ifNull": ["$rating_count", 0]}, delta]},
+            f"rating_histogram.{rating}": {"$add": [{"$ifNull": [f"$rating_histogram.{rating}", 0]}, delta]}
+        }},
+        {"$set": {"rating_avg": {"$cond": [
+            {"$gt": ["$rating_count", 0]},
+            {"$round": [{"$divide": ["$rating_sum", "$rating_count"]}, 2]},
+            None
+        ]}}}
+    ])
+
+def recompute_restaurant_ratings(restaurant_ids=None):
+    """Rebuild the rating aggregates from the reviews collection"""
+    review_match = {"restaurant_id": {"$in": restaurant_ids}} if restaurant_ids is not None else {}
+    histograms = {}
+    for row in mongo.db.reviews.aggregate([
+        {"$match": review_match},
+        {"$group": {"_id": {"restaurant_id": "$restaurant_id", "rating": "$rating"}, "count": {"$sum": 1}}}
+    ]):
+        histograms.setdefault(row["_id"]["restaurant_id"], {})[str(row["_id"]["rating"])] = row["count"]
+
+    operations = []
+    restaurant_match = {"_id": {"$in": restaurant_ids}} if restaurant_ids is not None else {}
+    for restaurant in mongo.db.restaurants.find(restaurant_match, {"_id": 1}):
+        histogram = histograms.get(restaurant["_id"], {})
+        count = sum(histogram.values())
+        total = sum(int(rating) * n for rating, n in histogram.items())
+        operations.append(UpdateOne({"_id": restaurant["_id"]}, {"$set": {
+            "rating_sum": total,
+            "rating_count": count,
+            "rating_histogram": histogram,
+            "rating_avg": round(total / count, 2) if count else None
+        }}))
+    if operations:
+        mongo.db.restaurants.bulk_write(operations, ordered=False)
+    return len(operations)
+
+@app.cli.command("rebuild-restaurant-ratings")
+def rebuild_restaurant_ratings():
+    """Recompute rating aggregates on every restaurant"""
+    restaurant_ids = mongo.db.restaurants.distinct("_id")
+    updated = recompute_restaurant_ratings(restaurant_ids)
+    bump_restaurant_version(restaurant_ids, "reviews_version")
+    click.echo(f"Rating aggregates rebuilt for {updated} restaurants")
+
 # Review Routes
 @app.route("/api/reviews", methods=["GET"])
+@cached_response("reviews", "reviews:{restaurant_id}")
 def get_reviews():
     try:
-        page, per_page = get_pagination_params()
         restaurant_id = request.args.get("restaurant_id")
         user_id = request.args.get("user_id")
         
@@ -1378,21 +3886,23 @@ def get_reviews():
         if user_id:
             query["user_id"] = ObjectId(user_id)
 
-        total = mongo.db.reviews.count_documents(query)
-        reviews = list(mongo.db.reviews.find(query)
-                      .sort('created_at', -1)
-                      .skip((page-1)*per_page)
-                      .limit(per_page))
+        etag = None
+        if restaurant_id:
+            restaurant = mongo.db.restaurants.find_one({"_id": query["restaurant_id"]}, {"reviews_version": 1})
+            etag = make_etag(restaurant_id, (restaurant or {}).get("reviews_version", 0), request.query_string.decode())
+            if request.if_none_match.contains(etag):
+                return not_modified(etag)
+
+        reviews, pagination = paginate(mongo.db.reviews, query, 'created_at', DESCENDING)
 
-        return jsonify({
+        return etag_response({
             'data': json.loads(dumps(reviews)),
-            'pagination': {
-                'total': total,
-                'page': page,
-                'per_page': per_page,
-                'total_pages': (total + per_page - 1) // per_page
-            }
-        }), 200
+            'pagination': pagination
+        }, etag)
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
+    except InvalidId:
+        return jsonify({"error": "Invalid ID format"}), 400
     except PyMongoError as e:
         app.logger.error(f"Reviews error: {str(e)}")
         abort(500, "Failed to retrieve reviews")
@@ -1412,6 +3922,8 @@ def create_review():
         if profanity.contains_profanity(data["comment"]):
          abort(400, "Review contains inappropriate content")
         result = mongo.db.reviews.insert_one(review)
+        apply_review_rating(review["restaurant_id"], review["rating"], 1)
+        bump_restaurant_version(review["restaurant_id"], "reviews_version")
         return jsonify({"id": str(result.inserted_id)}), 201
     except Exception as e:
         app.logger.error(f"Review error: {str(e)}")
@@ -1431,7 +3943,9 @@ def delete_review(id):
         if review["user_id"] != user_id and user["role"] != "Admin":
             return jsonify({"error": "Unauthorized"}), 403
 
-        mongo.db.reviews.delete_one({"_id": ObjectId(id)})
+        if mongo.db.reviews.delete_one({"_id": ObjectId(id)}).deleted_count:
+            apply_review_rating(review["restaurant_id"], review["rating"], -1)
+        bump_restaurant_version(review["restaurant_id"], "reviews_version")
         return jsonify({"message": "Review deleted"}), 200
     except Exception as e:
         app.logger.error(f"Review deletion error: {str(e)}")
@@ -1514,19 +4028,30 @@ def delete_user(id):
         )
 
         mongo.db.users.delete_one({"_id": target_id})
+        # Before the restaurants go, so their schedules can still place each slot
+        purge_user_reservations(target_id)
 
         # Delete associated data    
        # In delete_user route
         mongo.db.restaurants.delete_many({"owner_id": target_id})  # Direct deletion instead of updating status
         mongo.db.menu_items.delete_many({"restaurant_id": target_id})
+        reviewed = mongo.db.reviews.distinct("restaurant_id", {"user_id": target_id})
         mongo.db.reviews.delete_many({"user_id": target_id})
-        mongo.db.reservations.delete_many({"user_id": target_id})
+        recompute_restaurant_ratings(reviewed)
+        bump_restaurant_version(reviewed, "reviews_version")
+        saved = mongo.db.saved_restaurants.distinct("restaurant_id", {"user_id": target_id})
+        mongo.db.saved_restaurants.delete_many({"user_id": target_id})
+        mongo.db.restaurants.update_many({"_id": {"$in": saved}}, {"$inc": {"save_count": -1}})
         restaurants = mongo.db.restaurants.find({"owner_id": target_id})
         for rest in restaurants:
              # Reuse restaurant deletion logic
                  delete_restaurant(str(rest["_id"]))  
 
 
+        if response_cache is not None:
+            response_cache.clear()
+        autocomplete_index.refresh_async()
+        facet_cache.clear()
         log_admin_action("user_deletion", "user", id)
         return jsonify({"message": "User deleted"}), 200
     except Exception as e:
@@ -1564,24 +4089,14 @@ def create_role_upgrade_request():
 @has_role("Admin")
 def get_role_upgrade_requests():
     try:
-        page, per_page = get_pagination_params()
         status = request.args.get("status", "pending")
         
         query = {"status": status}
-        total = mongo.db.role_upgrade_requests.count_documents(query)
-        requests = list(mongo.db.role_upgrade_requests.find(query)
-                       .sort('created_at', -1)
-                       .skip((page-1)*per_page)
-                       .limit(per_page))
+        requests, pagination = paginate(mongo.db.role_upgrade_requests, query, 'created_at', DESCENDING)
 
         return jsonify({
             'data': json.loads(dumps(requests)),
-            'pagination': {
-                'total': total,
-                'page': page,
-                'per_page': per_page,
-                'total_pages': (total + per_page - 1) // per_page
-            }
+            'pagination': pagination
         }), 200
     except PyMongoError as e:
         app.logger.error(f"Role requests error: {str(e)}")
@@ -1625,7 +4140,6 @@ def update_role_upgrade_request(id):
 @has_role("Admin")
 def admin_get_restaurants():
     try:
-        page, per_page = get_pagination_params()
         status = request.args.get("status", "pending")
         search = request.args.get('search', '').strip()
 
@@ -1638,19 +4152,13 @@ def admin_get_restaurants():
                 {'cuisine': {'$regex': re.escape(search), '$options': 'i'}}
             ]
 
-        total = mongo.db.restaurants.count_documents(query)
-        restaurants = list(mongo.db.restaurants.find(query)
-                          .skip((page-1)*per_page)
-                          .limit(per_page))
-        restaurants = list(mongo.db.restaurants.find(query, {"owner_id": 0, "admin_notes": 0}))
+        restaurants, pagination = paginate(
+            mongo.db.restaurants, query, 'created_at', DESCENDING,
+            projection=get_projection(RESTAURANT_FIELDS | {"admin_notes"}, ADMIN_RESTAURANT_SUMMARY_FIELDS)
+        )
         return jsonify({
             'data': json.loads(dumps(restaurants)),
-            'pagination': {
-                'total': total,
-                'page': page,
-                'per_page': per_page,
-                'total_pages': (total + per_page - 1) // per_page
-            }
+            'pagination': pagination
         }), 200
     except PyMongoError as e:
         app.logger.error(f"Admin restaurants error: {str(e)}")
@@ -1698,6 +4206,11 @@ def approve_restaurant_handler(id):
                     )
         # NEW CODE END ==================================
 
+        # Dish search results embed the restaurant's name and approval
+        invalidate_responses("restaurants", f"restaurant:{id}", "menu:", f"menu:{id}")
+        autocomplete_index.refresh_async()
+        facet_cache.clear()
+
         log_admin_action(
             action_type="restaurant_approval",
             target_type="restaurant",
@@ -1786,47 +4299,136 @@ def profile():
     except Exception as e:
         app.logger.error(f"Profile error: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
+# ========================
 # Saved Restaurants
+# ========================
+MAX_SAVED_CHECK_IDS = 100
+
+def recount_save_counts():
+    """Recompute save_count on every restaurant from the saved_restaurants collection"""
+    counts = {
+        row["_id"]: row["count"] for row in mongo.db.saved_restaurants.aggregate([
+            {"$group": {"_id": "$restaurant_id", "count": {"$sum": 1}}}
+        ])
+    }
+    operations = [
+        UpdateOne({"_id": restaurant["_id"]}, {"$set": {"save_count": counts.get(restaurant["_id"], 0)}})
+        for restaurant in mongo.db.restaurants.find({}, {"_id": 1})
+    ]
+    if operations:
+        mongo.db.restaurants.bulk_write(operations, ordered=False)
+    return len(operations)
+
+@app.cli.command("migrate-saved-restaurants")
+def migrate_saved_restaurants():
+    """Move users.saved_restaurants arrays into the saved_restaurants collection"""
+    migrated = 0
+    now = datetime.now(timezone.utc)
+    for user in mongo.db.users.find({"saved_restaurants": {"$exists": True}}, {"saved_restaurants": 1}):
+        operations = [
+            UpdateOne(
+                {"user_id": user["_id"], "restaurant_id": restaurant_id},
+                {"$setOnInsert": {"created_at": now}},
+                upsert=True
+            )
+            for restaurant_id in user.get("saved_restaurants") or []
+        ]
+        if operations:
+            migrated += mongo.db.saved_restaurants.bulk_write(operations, ordered=False).upserted_count
+        mongo.db.users.update_one({"_id": user["_id"]}, {"$unset": {"saved_restaurants": ""}})
+
+    recounted = recount_save_counts()
+    click.echo(f"Migrated {migrated} saved restaurants; recounted saves on {recounted} restaurants")
+
 @app.route("/api/saved-restaurants", methods=["POST", "GET", "DELETE"])
 @jwt_required()
 def saved_restaurants():
     try:
         user_id = ObjectId(get_jwt_identity())
-        restaurant_id = request.args.get("restaurant_id") or request.json.get("restaurant_id")
+        restaurant_id = request.args.get("restaurant_id") or (request.get_json(silent=True) or {}).get("restaurant_id")
         
         if request.method == "POST":
             # Validate restaurant exists and is approved
-            if not mongo.db.restaurants.find_one({"_id": ObjectId(restaurant_id), "status": "approved"}):
+            if not restaurant_id or not mongo.db.restaurants.find_one({"_id": ObjectId(restaurant_id), "status": "approved"}):
                 return jsonify({"error": "Invalid restaurant"}), 400
             
-            mongo.db.users.update_one(
-                {"_id": user_id},
-                {"$addToSet": {"saved_restaurants": ObjectId(restaurant_id)}}
-            )
+            try:
+                mongo.db.saved_restaurants.insert_one({
+                    "user_id": user_id,
+                    "restaurant_id": ObjectId(restaurant_id),
+                    "created_at": datetime.now(timezone.utc)
+                })
+            except DuplicateKeyError:
+                return jsonify({"message": "Restaurant saved"}), 200
+
+            mongo.db.restaurants.update_one({"_id": ObjectId(restaurant_id)}, {"$inc": {"save_count": 1}})
+            invalidate_responses(f"restaurant:{restaurant_id}")
             return jsonify({"message": "Restaurant saved"}), 200
         
         elif request.method == "GET":
-            user = mongo.db.users.find_one({"_id": user_id}, {"saved_restaurants": 1})
-            restaurants = list(mongo.db.restaurants.find({
-                "_id": {"$in": user.get("saved_restaurants", [])},
-                "status": "approved"
-            }))
-            return jsonify(json.loads(dumps(restaurants))), 200
+            saves, pagination = paginate(
+                mongo.db.saved_restaurants, {"user_id": user_id}, "created_at", DESCENDING
+            )
+            restaurants = {
+                restaurant["_id"]: restaurant for restaurant in mongo.db.restaurants.find({
+                    "_id": {"$in": [save["restaurant_id"] for save in saves]},
+                    "status": "approved"
+                }, get_projection(RESTAURANT_FIELDS, RESTAURANT_SUMMARY_FIELDS, ["admin_notes"]))
+            }
+            # Keep most-recently-saved order from the page of saves
+            data = [
+                {**restaurants[save["restaurant_id"]], "saved_at": save["created_at"]}
+                for save in saves if save["restaurant_id"] in restaurants
+            ]
+            return jsonify({
+                'data': json.loads(dumps(data)),
+                'pagination': pagination
+            }), 200
         
         elif request.method == "DELETE":
             if not restaurant_id:
                 return jsonify({"error": "Missing restaurant_id"}), 400
             
-            mongo.db.users.update_one(
-                {"_id": user_id},
-                {"$pull": {"saved_restaurants": ObjectId(restaurant_id)}}
-            )
+            result = mongo.db.saved_restaurants.delete_one({
+                "user_id": user_id,
+                "restaurant_id": ObjectId(restaurant_id)
+            })
+            if result.deleted_count:
+                mongo.db.restaurants.update_one({"_id": ObjectId(restaurant_id)}, {"$inc": {"save_count": -1}})
+                invalidate_responses(f"restaurant:{restaurant_id}")
             return jsonify({"message": "Restaurant unsaved"}), 200
             
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
+    except InvalidId:
+        return jsonify({"error": "Invalid ID format"}), 400
     except Exception as e:
          app.logger.error(f"Error: {str(e)}")
     return jsonify({"error": "Internal server error"}), 500
 
+@app.route("/api/saved-restaurants/check", methods=["GET"])
+@jwt_required()
+def check_saved_restaurants():
+    """Which of ?ids=a,b,c the current user has saved, in one query"""
+    try:
+        ids = [value.strip() for value in request.args.get("ids", "").split(",") if value.strip()]
+        if len(ids) > MAX_SAVED_CHECK_IDS:
+            abort(400, f"At most {MAX_SAVED_CHECK_IDS} ids per request")
+
+        saved = mongo.db.saved_restaurants.find(
+            {"user_id": ObjectId(get_jwt_identity()), "restaurant_id": {"$in": [ObjectId(value) for value in ids]}},
+            {"restaurant_id": 1, "_id": 0}
+        )
+        return jsonify({"saved": [str(save["restaurant_id"]) for save in saved]}), 200
+
+    except HTTPException as he:
+        return jsonify({"error": he.description}), he.code
+    except InvalidId:
+        return jsonify({"error": "Invalid ID format"}), 400
+    except Exception as e:
+        app.logger.error(f"Saved check error: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
 # Token Management
 @app.route("/api/refresh", methods=["POST"])
 @jwt_required(refresh=True)
@@ -1846,6 +4448,16 @@ def logout():
         "exp": exp_time
     })
     return jsonify(message="Logged out"), 200
+@app.route("/api/admin/cache-stats", methods=["GET"])
+@has_role("Admin")
+def cache_stats():
+    return jsonify({
+        "availability": availability_cache.stats(),
+        "schedules": schedule_cache.stats(),
+        "facets": facet_cache.stats(),
+        "responses": response_cache.backend.stats() if response_cache is not None else None
+    }), 200
+
 @app.route("/api/health")
 def health_check():
     try:
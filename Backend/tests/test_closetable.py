@@ -1,12 +1,17 @@
 import os
 import io
+import csv
 import pytest
 import bcrypt
 import json
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
 from bson import ObjectId
 from jsonschema import validate
 from dotenv import load_dotenv
+from flask_pymongo import PyMongo
+from src import main
 from src.main import app
 
 # Load test environment variables
@@ -39,6 +44,8 @@ def test_client():
         'TESTING': True,
         'MONGO_URI': os.getenv('MONGO_URI')
     })
+    # Every test logs in; keep the login rate limit out of the way
+    main.limiter.enabled = False
     with app.test_client() as client:
         yield client
 
@@ -54,6 +61,18 @@ def reset_db(mongo):
     mongo.db.reservations.delete_many({})
     mongo.db.reviews.delete_many({})
     mongo.db.role_upgrade_requests.delete_many({})
+    mongo.db.slot_occupancy.delete_many({})
+    mongo.db.reservation_rollups.delete_many({})
+    mongo.db.menu_items.delete_many({})
+    mongo.db.menu_snapshots.delete_many({})
+    mongo.db.menu_snapshot_history.delete_many({})
+    mongo.db.saved_restaurants.delete_many({})
+    mongo.db.fs.files.delete_many({})
+    mongo.db.fs.chunks.delete_many({})
+    main.response_cache.clear()
+    main.facet_cache.clear()
+    main.availability_cache.clear()
+    main.schedule_cache.clear()
 
 def create_test_user(mongo, role='Customer'):
     hashed_pw = bcrypt.hashpw('testpass123'.encode(), bcrypt.gensalt()).decode()
@@ -66,6 +85,26 @@ def create_test_user(mongo, role='Customer'):
     }).inserted_id
     return str(user_id)
 
+def create_test_restaurant(mongo, owner_id, **fields):
+    hours = {day: {'open': '18:00', 'close': '20:00'} for day in
+             ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']}
+    return mongo.db.restaurants.insert_one({
+        'name': 'Test Restaurant',
+        'city': 'Test City',
+        'cuisine': 'Test',
+        'owner_id': ObjectId(owner_id),
+        'status': 'approved',
+        'capacity': 10,
+        'timezone': 'UTC',
+        'opening_hours': hours,
+        'created_at': datetime.utcnow(),
+        **fields
+    }).inserted_id
+
+def tomorrow_at(hour, minute=0):
+    day = (datetime.utcnow() + timedelta(days=1)).date()
+    return datetime.combine(day, datetime.min.time()).replace(hour=hour, minute=minute)
+
 def get_auth_headers(test_client, email, password):
     response = test_client.post('/api/login', json={
         'email': email,
@@ -125,5 +164,866 @@ def test_admin_restaurant_approval(test_client, mongo):
     restaurant = mongo.db.restaurants.find_one()
     assert restaurant['status'] == 'approved'
 
+def make_schedule(hours, tz='UTC', days=main.WEEKDAYS):
+    return main.RestaurantSchedule({
+        '_id': ObjectId(), 'timezone': tz,
+        'opening_hours': {day: {'open': hours[0], 'close': hours[1]} for day in days}
+    })
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+def test_schedule_slots_for_a_normal_day():
+    schedule = make_schedule(('18:00', '20:00'), tz='Asia/Kolkata')
+    slots = schedule.slots_for_date(date(2026, 6, 1))
+    assert slots == [utc(2026, 6, 1, 12, 30), utc(2026, 6, 1, 13, 0),
+                     utc(2026, 6, 1, 13, 30), utc(2026, 6, 1, 14, 0)]
+    assert schedule.slot_for(utc(2026, 6, 1, 13, 10)) == utc(2026, 6, 1, 13, 0)
+    assert schedule.slot_for(utc(2026, 6, 1, 14, 30)) is None
+
+def test_schedule_overnight_service_belongs_to_opening_day():
+    # Friday 2026-03-27, open 18:00-02:00
+    schedule = make_schedule(('18:00', '02:00'), days=['friday'])
+    slots = schedule.slots_for_date(date(2026, 3, 27))
+    assert len(slots) == 16
+    assert slots[-1] == utc(2026, 3, 28, 1, 30)
+
+    after_midnight = utc(2026, 3, 28, 1, 10)
+    assert schedule.is_open_at(after_midnight)
+    assert schedule.slot_for(after_midnight) == utc(2026, 3, 28, 1, 0)
+    assert schedule.service_date(after_midnight) == date(2026, 3, 27)
+    # Saturday has no service of its own
+    assert schedule.slots_for_date(date(2026, 3, 28)) == []
+    assert not schedule.is_open_at(utc(2026, 3, 28, 2, 0))
+
+def test_schedule_closed_day_and_local_date_rollover():
+    restaurant = {'_id': ObjectId(), 'timezone': 'America/New_York',
+                  'opening_hours': {'monday': {'open': '09:00', 'close': '17:00'}}}
+    schedule = main.RestaurantSchedule(restaurant)
+    assert schedule.slots_for_date(date(2026, 6, 2)) == []
+    # Closed instants fall back to the local calendar date, which lags UTC here
+    assert main.get_local_date(restaurant, utc(2026, 6, 2, 2, 0)) == date(2026, 6, 1)
+    assert main.get_local_date(restaurant, utc(2026, 6, 2, 14, 0)) == date(2026, 6, 2)
+
+def test_schedule_skips_wall_times_lost_to_dst():
+    # Europe/London springs forward from 01:00 to 02:00 on 2026-03-29
+    schedule = make_schedule(('00:30', '03:00'), tz='Europe/London')
+    slots = schedule.slots_for_date(date(2026, 3, 29))
+    assert slots == [utc(2026, 3, 29, 0, 30), utc(2026, 3, 29, 1, 0), utc(2026, 3, 29, 1, 30)]
+
+def test_availability_sums_party_sizes(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    hours = {day: {'open': '18:00', 'close': '20:00'} for day in
+             ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']}
+    restaurant_id = mongo.db.restaurants.insert_one({
+        'name': 'Slot Test',
+        'owner_id': ObjectId(owner_id),
+        'status': 'approved',
+        'capacity': 10,
+        'timezone': 'UTC',
+        'opening_hours': hours
+    }).inserted_id
+
+    day = (datetime.utcnow() + timedelta(days=1)).date()
+    slot = datetime.combine(day, datetime.min.time()).replace(hour=18)
+    mongo.db.reservations.insert_many([
+        {'restaurant_id': restaurant_id, 'datetime': slot, 'party_size': 6, 'status': 'confirmed'},
+        {'restaurant_id': restaurant_id, 'datetime': slot, 'party_size': 4, 'status': 'confirmed'},
+        {'restaurant_id': restaurant_id, 'datetime': slot, 'party_size': 5, 'status': 'canceled'}
+    ])
+
+    response = test_client.get(f'/api/restaurants/{restaurant_id}/availability?date={day.isoformat()}')
+    assert response.status_code == 200
+    slots = response.json['slots']
+    assert len(slots) == 4
+    assert slots[0]['booked'] == 10
+    assert not slots[0]['available']
+    assert len(response.json['available_slots']) == 3
+
+def test_availability_buckets_legacy_reservations_by_schedule(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+    # Half-hour UTC offset and a quarter-past opening both misalign with epoch half hours
+    cases = [
+        ('Asia/Kolkata', {day: {'open': '18:00', 'close': '20:00'} for day in days}, timedelta(hours=5, minutes=30)),
+        ('UTC', {day: {'open': '18:15', 'close': '20:15'} for day in days}, timedelta(0))
+    ]
+    for tz, hours, offset in cases:
+        restaurant_id = mongo.db.restaurants.insert_one({
+            'name': f'Legacy {tz}',
+            'owner_id': ObjectId(owner_id),
+            'status': 'approved',
+            'capacity': 10,
+            'timezone': tz,
+            'opening_hours': hours
+        }).inserted_id
+
+        day = (datetime.utcnow() + timedelta(days=2)).date()
+        opening = datetime.strptime(hours['monday']['open'], '%H:%M').time()
+        first_slot_utc = datetime.combine(day, opening) - offset
+        # Legacy document: no slot_start, booked a few minutes into the first slot
+        mongo.db.reservations.insert_one({
+            'restaurant_id': restaurant_id,
+            'datetime': first_slot_utc + timedelta(minutes=10),
+            'party_size': 10,
+            'status': 'confirmed'
+        })
+
+        response = test_client.get(f'/api/restaurants/{restaurant_id}/availability?date={day.isoformat()}')
+        assert response.status_code == 200
+        slots = response.json['slots']
+        assert slots[0]['booked'] == 10
+        assert not slots[0]['available']
+        assert all(slot['booked'] == 0 for slot in slots[1:])
+
+def test_reservation_capacity_counts_existing_bookings(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    create_test_user(mongo)
+    headers = get_auth_headers(test_client, 'test_customer@example.com', 'testpass123')
+    restaurant_id = create_test_restaurant(mongo, owner_id)
+    slot = tomorrow_at(18)
+
+    # Booked before slot counters existed: no slot_occupancy document yet
+    mongo.db.reservations.insert_one({
+        'restaurant_id': restaurant_id, 'datetime': slot, 'party_size': 6, 'status': 'confirmed'
+    })
+
+    payload = {'restaurant_id': str(restaurant_id), 'datetime': slot.isoformat() + 'Z'}
+    response = test_client.post('/api/reservations', json={**payload, 'party_size': 5}, headers=headers)
+    assert response.status_code == 400
+
+    response = test_client.post('/api/reservations', json={**payload, 'party_size': 4}, headers=headers)
+    assert response.status_code == 201
+    counter = mongo.db.slot_occupancy.find_one({'restaurant_id': restaurant_id})
+    assert counter['covers'] == 10
+
+    response = test_client.post('/api/reservations', json={**payload, 'party_size': 1}, headers=headers)
+    assert response.status_code == 400
+
+def test_reservation_cancel_releases_capacity(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    create_test_user(mongo)
+    headers = get_auth_headers(test_client, 'test_customer@example.com', 'testpass123')
+    restaurant_id = create_test_restaurant(mongo, owner_id)
+    payload = {'restaurant_id': str(restaurant_id), 'datetime': tomorrow_at(18).isoformat() + 'Z'}
+
+    response = test_client.post('/api/reservations', json={**payload, 'party_size': 10}, headers=headers)
+    assert response.status_code == 201
+
+    cancel = test_client.delete(f'/api/reservations/{response.json["id"]}', headers=headers)
+    assert cancel.status_code == 200
+    assert mongo.db.slot_occupancy.find_one({'restaurant_id': restaurant_id})['covers'] == 0
+
+    response = test_client.post('/api/reservations', json={**payload, 'party_size': 10}, headers=headers)
+    assert response.status_code == 201
+
+def test_reservation_reschedule_conflict_returns_claimed_capacity(test_client, mongo, monkeypatch):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    create_test_user(mongo)
+    headers = get_auth_headers(test_client, 'test_customer@example.com', 'testpass123')
+    restaurant_id = create_test_restaurant(mongo, owner_id)
+    response = test_client.post('/api/reservations', json={
+        'restaurant_id': str(restaurant_id),
+        'datetime': tomorrow_at(18).isoformat() + 'Z',
+        'party_size': 2
+    }, headers=headers)
+    reservation_id = ObjectId(response.json['id'])
+
+    # Another writer changes the reservation between our read and our update
+    reserve = main.reserve_slot_capacity
+    def reserve_then_interfere(*args):
+        claimed = reserve(*args)
+        mongo.db.reservations.update_one({'_id': reservation_id}, {'$set': {'party_size': 3}})
+        return claimed
+    monkeypatch.setattr(main, 'reserve_slot_capacity', reserve_then_interfere)
+
+    new_slot = tomorrow_at(19)
+    response = test_client.put(f'/api/reservations/{reservation_id}', json={
+        'datetime': new_slot.isoformat() + 'Z'
+    }, headers=headers)
+    assert response.status_code == 409
+    # The covers claimed in the new slot were handed back
+    counter = mongo.db.slot_occupancy.find_one({'restaurant_id': restaurant_id, 'slot_start': new_slot})
+    assert counter['covers'] == 0
+
+def test_deleting_user_releases_their_reservations(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    customer_id = create_test_user(mongo)
+    create_test_user(mongo, 'Admin')
+    headers = get_auth_headers(test_client, 'test_customer@example.com', 'testpass123')
+    admin_headers = get_auth_headers(test_client, 'test_admin@example.com', 'testpass123')
+    restaurant_id = create_test_restaurant(mongo, owner_id)
+    slot = tomorrow_at(18)
+
+    response = test_client.post('/api/reservations', headers=headers, json={
+        'restaurant_id': str(restaurant_id), 'datetime': slot.isoformat() + 'Z', 'party_size': 10
+    })
+    assert response.status_code == 201
+    day = slot.date().isoformat()
+    assert not test_client.get(f'/api/restaurants/{restaurant_id}/availability?date={day}').json['slots'][0]['available']
+
+    response = test_client.delete(f'/api/admin/users/{customer_id}', headers=admin_headers)
+    assert response.status_code == 200
+    assert mongo.db.reservations.count_documents({}) == 0
+    assert mongo.db.slot_occupancy.find_one({'restaurant_id': restaurant_id})['covers'] == 0
+    assert test_client.get(f'/api/restaurants/{restaurant_id}/availability?date={day}').json['slots'][0]['available']
+    for rollup in mongo.db.reservation_rollups.find({'restaurant_id': restaurant_id}):
+        assert rollup.get('bookings', 0) == 0 and rollup.get('covers', 0) == 0
+
+def test_menu_items_unpaginated_returns_whole_menu(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    restaurant_id = create_test_restaurant(mongo, owner_id)
+    mongo.db.menu_items.insert_many([
+        {'restaurant_id': restaurant_id, 'name': f'Dish {i}', 'price': 5.0,
+         'category': 'Mains' if i % 2 else 'Starters'}
+        for i in range(15)
+    ])
+
+    response = test_client.get(f'/api/menu-items?restaurant_id={restaurant_id}')
+    assert response.status_code == 200
+    assert isinstance(response.json, list)
+    assert len(response.json) == 15
+
+    response = test_client.get(f'/api/menu-items?restaurant_id={restaurant_id}&page=1&per_page=10')
+    assert len(response.json['data']) == 10
+    assert response.json['pagination']['has_more']
+
+    response = test_client.get(f'/api/menu-items?restaurant_id={restaurant_id}&group=category')
+    assert [group['category'] for group in response.json['categories']] == ['Mains', 'Starters']
+
+def test_menu_groups_uncategorised_items_once(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    restaurant_id = create_test_restaurant(mongo, owner_id)
+    mongo.db.menu_items.insert_many([
+        {'restaurant_id': restaurant_id, 'name': 'Legacy', 'price': 4.0},
+        {'restaurant_id': restaurant_id, 'name': 'Bread', 'price': 2.0, 'category': 'Other'},
+        {'restaurant_id': restaurant_id, 'name': 'Curry', 'price': 9.0, 'category': 'Mains'}
+    ])
+
+    response = test_client.get(f'/api/menu-items?restaurant_id={restaurant_id}&group=category')
+    groups = response.json['categories']
+    assert [group['category'] for group in groups] == ['Mains', 'Other']
+    assert sorted(item['name'] for item in groups[1]['items']) == ['Bread', 'Legacy']
+
+    result = app.test_cli_runner().invoke(args=['backfill-menu-categories'])
+    assert result.exit_code == 0
+    assert mongo.db.menu_items.find_one({'name': 'Legacy'})['category'] == 'Other'
+
+def test_menu_snapshot_versions_follow_mutations(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    restaurant_id = create_test_restaurant(mongo, owner_id)
+    headers = get_auth_headers(test_client, 'test_restaurant owner@example.com', 'testpass123')
+
+    for name in ['Soup', 'Salad']:
+        response = test_client.post('/api/menu-items', headers=headers, json={
+            'restaurant_id': str(restaurant_id), 'name': name, 'price': 7.5, 'category': 'Starters'
+        })
+        assert response.status_code == 201
+
+    response = test_client.get(f'/api/restaurants/{restaurant_id}/menu')
+    assert response.status_code == 200
+    assert response.json['version'] == 2
+    assert sorted(item['name'] for item in response.json['items']) == ['Salad', 'Soup']
+
+    response = test_client.get(f'/api/restaurants/{restaurant_id}/menu',
+                               headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+
+    response = test_client.get(f'/api/restaurants/{restaurant_id}/menu?version=1')
+    assert [item['name'] for item in response.json['items']] == ['Soup']
+
+    history = test_client.get(f'/api/restaurants/{restaurant_id}/menu/history').json
+    assert [entry['version'] for entry in history] == [2, 1]
+
+def test_menu_reads_do_not_build_snapshots(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    restaurant_id = create_test_restaurant(mongo, owner_id)
+    mongo.db.menu_items.insert_one({'restaurant_id': restaurant_id, 'name': 'Legacy Dish',
+                                    'price': 9.0, 'category': 'Mains'})
+
+    response = test_client.get(f'/api/restaurants/{restaurant_id}/menu')
+    assert response.status_code == 200
+    assert [item['name'] for item in response.json['items']] == ['Legacy Dish']
+    response = test_client.get(f'/api/menu-items?restaurant_id={restaurant_id}')
+    assert [item['name'] for item in response.json] == ['Legacy Dish']
+
+    assert mongo.db.menu_snapshots.count_documents({}) == 0
+    assert mongo.db.menu_snapshot_history.count_documents({}) == 0
+    assert 'menu_version' not in mongo.db.restaurants.find_one({'_id': restaurant_id})
+
+def test_menu_of_unapproved_restaurant_is_hidden(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    restaurant_id = create_test_restaurant(mongo, owner_id, status='pending')
+
+    assert test_client.get(f'/api/restaurants/{restaurant_id}/menu').status_code == 404
+    assert test_client.get(f'/api/restaurants/{restaurant_id}/menu/history').status_code == 404
+
+def test_restaurant_etag_tracks_ratings_and_menu(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    customer_id = create_test_user(mongo, 'Customer')
+    restaurant_id = create_test_restaurant(mongo, owner_id)
+
+    response = test_client.get(f'/api/restaurants/{restaurant_id}')
+    etag = response.headers['ETag']
+    response = test_client.get(f'/api/restaurants/{restaurant_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+    # Reviews written behind the API's back surface once the aggregates are rebuilt
+    mongo.db.reviews.insert_one({'restaurant_id': restaurant_id, 'user_id': ObjectId(customer_id),
+                                 'rating': 4, 'comment': 'Good', 'created_at': datetime.utcnow()})
+    result = app.test_cli_runner().invoke(args=['rebuild-restaurant-ratings'])
+    assert result.exit_code == 0
+    response = test_client.get(f'/api/restaurants/{restaurant_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json['rating_count'] == 1
+    etag = response.headers['ETag']
+
+    with app.app_context():
+        main.rebuild_menu_snapshot(restaurant_id)
+    response = test_client.get(f'/api/restaurants/{restaurant_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json['menu_version'] == 1
+
+def test_bulk_menu_import_reports_row_errors(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    restaurant_id = create_test_restaurant(mongo, owner_id)
+    headers = get_auth_headers(test_client, 'test_restaurant owner@example.com', 'testpass123')
+    mongo.db.menu_items.insert_one({'restaurant_id': restaurant_id, 'name': 'Soup',
+                                    'price': 5.0, 'category': 'Starters'})
+
+    response = test_client.post('/api/menu-items/bulk', headers=headers, json={
+        'restaurant_id': str(restaurant_id),
+        'items': [
+            {'name': 'Soup', 'price': 6.0, 'category': 'Starters'},
+            {'name': '', 'price': 4.0},
+            {'name': 'Steak', 'price': -1},
+            {'name': 'Pie', 'price': 8.0},
+            {'name': 'Pie', 'price': 9.0},
+            {'name': 'Tart', 'price': 3.0, 'image': 'not-an-id'}
+        ]
+    })
+    assert response.status_code == 200
+    assert response.json['inserted'] == 1
+    assert response.json['updated'] == 1
+    assert response.json['errors'] == [
+        {'row': 1, 'error': 'Name is required'},
+        {'row': 2, 'error': 'Invalid price'},
+        {'row': 4, 'error': 'Duplicate name in import'},
+        {'row': 5, 'error': 'Invalid image ID format'}
+    ]
+    assert mongo.db.menu_items.find_one({'restaurant_id': restaurant_id, 'name': 'Soup'})['price'] == 6.0
+
+def test_bulk_menu_import_keeps_or_replaces_images(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    restaurant_id = create_test_restaurant(mongo, owner_id)
+    headers = get_auth_headers(test_client, 'test_restaurant owner@example.com', 'testpass123')
+    old_image = main.fs.put(b'old', metadata={'restaurant_id': restaurant_id})
+    new_image = main.fs.put(b'new', metadata={'restaurant_id': restaurant_id})
+    mongo.db.menu_items.insert_one({'restaurant_id': restaurant_id, 'name': 'Soup', 'price': 5.0,
+                                    'category': 'Starters', 'image': old_image})
+    dish = lambda: mongo.db.menu_items.find_one({'name': 'Soup'})
+
+    # A row without an image leaves the dish's image alone
+    response = test_client.post('/api/menu-items/bulk', headers=headers, json={
+        'restaurant_id': str(restaurant_id), 'items': [{'name': 'Soup', 'price': 6.0}]
+    })
+    assert response.status_code == 200
+    assert dish()['image'] == old_image
+    assert dish()['price'] == 6.0
+
+    # A new image replaces the old one, which is deleted
+    response = test_client.post('/api/menu-items/bulk', headers=headers, json={
+        'restaurant_id': str(restaurant_id), 'items': [{'name': 'Soup', 'price': 6.0, 'image': str(new_image)}]
+    })
+    assert response.status_code == 200
+    assert dish()['image'] == new_image
+    assert not main.fs.exists(old_image)
+
+def test_bulk_menu_import_requires_restaurant_id(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    create_test_restaurant(mongo, owner_id)
+    headers = get_auth_headers(test_client, 'test_restaurant owner@example.com', 'testpass123')
+
+    response = test_client.post('/api/menu-items/bulk', headers=headers,
+                                json=[{'name': 'Soup', 'price': 5.0}])
+    assert response.status_code == 400
+    assert response.json['error'] == 'Missing restaurant_id'
+    assert mongo.db.menu_items.count_documents({}) == 0
+
+def test_autocomplete_refresh_reruns_after_concurrent_request(monkeypatch):
+    index = main.AutocompleteIndex()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def refresh():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            started.set()
+            release.wait(5)
+    monkeypatch.setattr(index, 'refresh', refresh)
+
+    index.refresh_async()
+    assert started.wait(5)
+    # Writes landing mid-refresh coalesce into a single follow-up pass
+    index.refresh_async()
+    index.refresh_async()
+    release.set()
+
+    deadline = time.monotonic() + 5
+    while index._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert calls == [0, 1]
+
+def test_nearby_rejects_invalid_radius(test_client, mongo):
+    for radius in ['-5', '0', 'abc', 'nan']:
+        response = test_client.get(f'/api/restaurants/nearby?lat=31.5&lng=74.3&radius={radius}')
+        assert response.status_code == 400
+        response = test_client.get(f'/api/menu-items?q=soup&lat=31.5&lng=74.3&radius={radius}')
+        assert response.status_code == 400
+
+def test_restaurant_cursor_pagination_walks_ties_once(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    ids = [create_test_restaurant(mongo, owner_id, name=f'R{i}', rating_avg=rating)
+           for i, rating in enumerate([4.5, 4.5, 4.5, 3.0])]
+    create_test_restaurant(mongo, owner_id, name='Unrated')
+
+    seen = []
+    cursor = ''
+    while True:
+        response = test_client.get(f'/api/restaurants?sort=rating&per_page=2&cursor={cursor}')
+        assert response.status_code == 200
+        assert 'total' not in response.json
+        seen += [doc['_id']['$oid'] for doc in response.json['data']]
+        if not response.json['has_more']:
+            break
+        cursor = response.json['next_cursor']
+
+    # Ties on rating_avg fall back to _id in the same direction
+    expected = sorted(ids[:3], reverse=True) + [ids[3]]
+    assert seen == [str(restaurant_id) for restaurant_id in expected]
+
+def test_restaurant_cursor_rejects_garbage(test_client, mongo):
+    response = test_client.get('/api/restaurants?cursor=not-a-cursor')
+    assert response.status_code == 400
+
+def test_response_cache_invalidated_by_mutations(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    restaurant_id = create_test_restaurant(mongo, owner_id)
+    headers = get_auth_headers(test_client, 'test_restaurant owner@example.com', 'testpass123')
+    url = f'/api/menu-items?restaurant_id={restaurant_id}'
+
+    assert test_client.get(url).json == []
+    # A write that skips the mutators is not seen until the entry expires
+    mongo.db.menu_items.insert_one({'restaurant_id': restaurant_id, 'name': 'Hidden',
+                                    'price': 5.0, 'category': 'Mains'})
+    assert test_client.get(url).json == []
+
+    response = test_client.post('/api/menu-items', headers=headers, json={
+        'restaurant_id': str(restaurant_id), 'name': 'Curry', 'price': 12.0, 'category': 'Mains'
+    })
+    assert response.status_code == 201
+    assert sorted(item['name'] for item in test_client.get(url).json) == ['Curry', 'Hidden']
+
+    # Authenticated reads bypass the cache entirely
+    paged_url = f'{url}&page=1'
+    assert test_client.get(paged_url).json['pagination']['total'] == 2
+    mongo.db.menu_items.insert_one({'restaurant_id': restaurant_id, 'name': 'Also Hidden',
+                                    'price': 5.0, 'category': 'Mains'})
+    assert test_client.get(paged_url).json['pagination']['total'] == 2
+    assert test_client.get(paged_url, headers=headers).json['pagination']['total'] == 3
+
+def test_save_count_follows_saves_and_unsaves(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    create_test_user(mongo, 'Customer')
+    restaurant_id = create_test_restaurant(mongo, owner_id)
+    headers = get_auth_headers(test_client, 'test_customer@example.com', 'testpass123')
+    save_count = lambda: mongo.db.restaurants.find_one({'_id': restaurant_id}).get('save_count', 0)
+
+    # Saving twice is idempotent
+    for _ in range(2):
+        response = test_client.post('/api/saved-restaurants', headers=headers,
+                                    json={'restaurant_id': str(restaurant_id)})
+        assert response.status_code == 200
+    assert save_count() == 1
+
+    response = test_client.get(f'/api/saved-restaurants/check?ids={restaurant_id}', headers=headers)
+    assert response.json['saved'] == [str(restaurant_id)]
+    response = test_client.get('/api/saved-restaurants', headers=headers)
+    assert [doc['_id']['$oid'] for doc in response.json['data']] == [str(restaurant_id)]
+
+    for _ in range(2):
+        response = test_client.delete(f'/api/saved-restaurants?restaurant_id={restaurant_id}', headers=headers)
+        assert response.status_code == 200
+    assert save_count() == 0
+
+def test_migrate_saved_restaurants_recounts(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    customer_id = create_test_user(mongo, 'Customer')
+    restaurant_id = create_test_restaurant(mongo, owner_id, save_count=7)
+    mongo.db.users.update_one({'_id': ObjectId(customer_id)},
+                              {'$set': {'saved_restaurants': [restaurant_id]}})
+
+    result = app.test_cli_runner().invoke(args=['migrate-saved-restaurants'])
+    assert result.exit_code == 0
+    assert mongo.db.saved_restaurants.count_documents({'user_id': ObjectId(customer_id)}) == 1
+    assert mongo.db.restaurants.find_one({'_id': restaurant_id})['save_count'] == 1
+    assert 'saved_restaurants' not in mongo.db.users.find_one({'_id': ObjectId(customer_id)})
+
+def test_image_upload_requires_content_length(test_client, mongo):
+    create_test_user(mongo, 'Customer')
+    headers = get_auth_headers(test_client, 'test_customer@example.com', 'testpass123')
+
+    response = test_client.post('/api/images', headers=headers, input_stream=io.BytesIO(b'data'),
+                                environ_overrides={'CONTENT_LENGTH': None})
+    assert response.status_code == 411
+
+def test_image_upload_rejects_oversized_files(test_client, mongo, monkeypatch):
+    create_test_user(mongo, 'Customer')
+    headers = get_auth_headers(test_client, 'test_customer@example.com', 'testpass123')
+    monkeypatch.setattr(main, 'MAX_FILE_SIZE', 1024)
+    upload = lambda size: {'file': (io.BytesIO(b'\0' * size), 'photo.png')}
+
+    # Refused on the declared Content-Length alone
+    monkeypatch.setattr(main, 'MAX_UPLOAD_OVERHEAD', 1024)
+    response = test_client.post('/api/images', headers=headers, data=upload(4096),
+                                content_type='multipart/form-data')
+    assert response.status_code == 413
+
+    # Within the envelope, but the streamed file itself passes the limit
+    monkeypatch.setattr(main, 'MAX_UPLOAD_OVERHEAD', 64 * 1024)
+    response = test_client.post('/api/images', headers=headers, data=upload(4096),
+                                content_type='multipart/form-data')
+    assert response.status_code == 413
+    assert mongo.db.fs.files.count_documents({}) == 0
+
+def test_image_upload_timeout_returns_503(test_client, mongo, monkeypatch):
+    create_test_user(mongo, 'Customer')
+    headers = get_auth_headers(test_client, 'test_customer@example.com', 'testpass123')
+
+    def slow_job(*args):
+        raise main.FutureTimeoutError()
+    monkeypatch.setattr(main, 'run_image_job', slow_job)
+
+    response = test_client.post('/api/images', headers=headers, content_type='multipart/form-data',
+                                data={'file': (io.BytesIO(b'\x89PNG'), 'photo.png')})
+    assert response.status_code == 503
+
+def test_select_image_variant():
+    derivatives = [
+        {'file_id': 'a', 'width': 320, 'content_type': 'image/jpeg'},
+        {'file_id': 'b', 'width': 320, 'content_type': 'image/webp'},
+        {'file_id': 'c', 'width': 800, 'content_type': 'image/jpeg'},
+        {'file_id': 'd', 'width': 800, 'content_type': 'image/webp'}
+    ]
+    assert main.select_image_variant(derivatives, 300, True)['file_id'] == 'b'
+    assert main.select_image_variant(derivatives, 300, False)['file_id'] == 'a'
+    assert main.select_image_variant(derivatives, 500, True)['file_id'] == 'd'
+    assert main.select_image_variant(derivatives, 500, False)['file_id'] == 'c'
+    assert main.select_image_variant(derivatives, 1200, True) is None
+    assert main.select_image_variant([], 300, True) is None
+
+def test_image_width_request_serves_variant_or_original(test_client, mongo):
+    derivative_id = main.fs.put(b'small', content_type='image/webp')
+    with_variants = main.fs.put(b'original', content_type='image/jpeg', metadata={'derivatives': [
+        {'file_id': derivative_id, 'width': 320, 'content_type': 'image/webp'}
+    ]})
+    legacy = main.fs.put(b'legacy', content_type='image/jpeg')
+
+    response = test_client.get(f'/api/images/{with_variants}?w=300', headers={'Accept': 'image/webp'})
+    assert response.data == b'small'
+    response = test_client.get(f'/api/images/{with_variants}?w=300', headers={'Accept': 'image/jpeg'})
+    assert response.data == b'original'
+
+    # Reads never generate derivatives; legacy images are served as uploaded
+    response = test_client.get(f'/api/images/{legacy}?w=300')
+    assert response.data == b'legacy'
+    assert mongo.db.fs.files.count_documents({'metadata.derivative_of': legacy}) == 0
+
+def test_dish_search_cache_invalidated_by_approval(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    create_test_user(mongo, 'Admin')
+    admin_headers = get_auth_headers(test_client, 'test_admin@example.com', 'testpass123')
+    restaurant_id = create_test_restaurant(mongo, owner_id, status='pending')
+    mongo.db.menu_items.insert_one({'restaurant_id': restaurant_id, 'name': 'Chicken Curry',
+                                    'price': 12.0, 'category': 'Mains'})
+
+    assert test_client.get('/api/menu-items?q=curry').json['data'] == []
+
+    response = test_client.put(f'/api/admin/restaurants/{restaurant_id}/approve', headers=admin_headers)
+    assert response.status_code == 200
+    results = test_client.get('/api/menu-items?q=curry').json['data']
+    assert [item['restaurant']['name'] for item in results] == ['Test Restaurant']
+
+def test_restaurant_search_matches_cuisine_like_the_list(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    create_test_restaurant(mongo, owner_id, name='Trattoria Roma', cuisine='Italian')
+
+    listed = test_client.get('/api/restaurants?cuisine=italian').json['data']
+    searched = test_client.get('/api/restaurants?q=trattoria&cuisine=italian').json['data']
+    assert [r['name'] for r in listed] == [r['name'] for r in searched] == ['Trattoria Roma']
+
+def test_availability_calendar_day_states(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    start = tomorrow_at(18)
+    closed_day = main.WEEKDAYS[(start + timedelta(days=1)).weekday()]
+    hours = {day: {'open': '18:00', 'close': '19:00'} for day in main.WEEKDAYS if day != closed_day}
+    restaurant_id = create_test_restaurant(mongo, owner_id, opening_hours=hours)
+    mongo.db.reservations.insert_one({'restaurant_id': restaurant_id, 'datetime': start,
+                                      'slot_start': start, 'party_size': 9, 'status': 'confirmed'})
+
+    first = start.date()
+    response = test_client.get(f'/api/restaurants/{restaurant_id}/availability/calendar'
+                               f'?start={first.isoformat()}&end={(first + timedelta(days=6)).isoformat()}&party_size=2')
+    assert response.status_code == 200
+    days = response.json['days']
+    assert len(days) == 7
+
+    # Nearly full first slot, free second slot, then a closed day
+    assert days[0]['open']
+    assert [slot['booked'] for slot in days[0]['slots']] == [9, 0]
+    assert len(days[0]['available_slots']) == 1
+    assert days[1] == {'date': (first + timedelta(days=1)).isoformat(), 'open': False,
+                       'available_slots': [], 'slots': []}
+    assert all(len(day['available_slots']) == 2 for day in days[2:])
+
+    base = f'/api/restaurants/{restaurant_id}/availability/calendar'
+    assert test_client.get(f'{base}?start=2030-01-10&end=2030-01-09').status_code == 400
+    assert test_client.get(f'{base}?start=2030-01-01&end=2030-03-01').status_code == 400
+
+def test_find_table_skips_full_restaurants(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    full_id = create_test_restaurant(mongo, owner_id, name='Full House')
+    create_test_restaurant(mongo, owner_id, name='Open Table')
+    slot = tomorrow_at(18, 30)
+    mongo.db.reservations.insert_one({'restaurant_id': full_id, 'datetime': slot,
+                                      'slot_start': slot, 'party_size': 10, 'status': 'confirmed'})
+
+    # window=0 only considers the requested slot
+    response = test_client.get(f'/api/find-table?datetime={slot.isoformat()}&party_size=2&window=0')
+    assert response.status_code == 200
+    assert [match['restaurant']['name'] for match in response.json['data']] == ['Open Table']
+
+    # Widening the window offers the full restaurant's neighbouring slots, nearest first
+    response = test_client.get(f'/api/find-table?datetime={slot.isoformat()}&party_size=2&window=1')
+    matches = {match['restaurant']['name']: match['available_slots'] for match in response.json['data']}
+    assert len(matches['Full House']) == 2
+    assert matches['Open Table'][0].startswith(slot.strftime('%Y-%m-%dT18:30'))
+
+    assert test_client.get('/api/find-table?party_size=2').status_code == 400
+    assert test_client.get(f'/api/find-table?datetime={slot.isoformat()}&party_size=11').json['data'] == []
+
+def test_availability_cache_invalidated_by_booking(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    create_test_user(mongo)
+    headers = get_auth_headers(test_client, 'test_customer@example.com', 'testpass123')
+    restaurant_id = create_test_restaurant(mongo, owner_id)
+    slot = tomorrow_at(18)
+    url = f'/api/restaurants/{restaurant_id}/availability?date={slot.date().isoformat()}'
+    booked = lambda: [s['booked'] for s in test_client.get(url).json['slots']][:2]
+
+    assert booked() == [0, 0]
+    # Writes that bypass the API are served stale until the entry expires
+    mongo.db.reservations.insert_one({'restaurant_id': restaurant_id, 'datetime': slot + timedelta(minutes=30),
+                                      'slot_start': slot + timedelta(minutes=30), 'party_size': 3,
+                                      'status': 'confirmed'})
+    assert booked() == [0, 0]
+
+    response = test_client.post('/api/reservations', headers=headers, json={
+        'restaurant_id': str(restaurant_id), 'datetime': slot.isoformat() + 'Z', 'party_size': 2
+    })
+    assert response.status_code == 201
+    assert booked() == [2, 3]
+
+    test_client.delete(f'/api/reservations/{response.json["id"]}', headers=headers)
+    assert booked() == [0, 3]
+
+def test_reservation_rollups_follow_reschedule_and_cancel(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    create_test_user(mongo)
+    headers = get_auth_headers(test_client, 'test_customer@example.com', 'testpass123')
+    restaurant_id = create_test_restaurant(mongo, owner_id)
+    slot = tomorrow_at(18)
+    day = datetime.combine(slot.date(), datetime.min.time())
+
+    def rollup(granularity, period_start):
+        doc = mongo.db.reservation_rollups.find_one({
+            'restaurant_id': restaurant_id, 'granularity': granularity, 'period_start': period_start
+        }) or {}
+        return doc.get('bookings', 0), doc.get('covers', 0), doc.get('cancellations', 0)
+
+    response = test_client.post('/api/reservations', headers=headers, json={
+        'restaurant_id': str(restaurant_id), 'datetime': slot.isoformat() + 'Z', 'party_size': 2
+    })
+    reservation_id = response.json['id']
+    assert rollup('day', day) == (1, 2, 0)
+    assert rollup('hour', slot) == (1, 2, 0)
+
+    # Moving the booking shifts it between hours; the day is unchanged
+    response = test_client.put(f'/api/reservations/{reservation_id}', headers=headers, json={
+        'datetime': tomorrow_at(19).isoformat() + 'Z', 'party_size': 4
+    })
+    assert response.status_code == 200
+    assert rollup('hour', slot) == (0, 0, 0)
+    assert rollup('hour', tomorrow_at(19)) == (1, 4, 0)
+    assert rollup('day', day) == (1, 4, 0)
+
+    test_client.delete(f'/api/reservations/{reservation_id}', headers=headers)
+    assert rollup('hour', tomorrow_at(19)) == (1, 0, 1)
+    assert rollup('day', day) == (1, 0, 1)
+
+def test_reservation_export_is_scoped_to_owner(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    headers = get_auth_headers(test_client, 'test_restaurant owner@example.com', 'testpass123')
+    mine = create_test_restaurant(mongo, owner_id, name='Mine')
+    other_owner = ObjectId()
+    theirs = create_test_restaurant(mongo, str(other_owner), name='Theirs')
+    slot = tomorrow_at(18)
+    mongo.db.reservations.insert_many([
+        {'restaurant_id': mine, 'owner_id': ObjectId(owner_id), 'user_id': ObjectId(),
+         'datetime': slot + timedelta(minutes=30 * i), 'party_size': i + 1, 'status': 'confirmed'}
+        for i in range(3)
+    ] + [{'restaurant_id': theirs, 'owner_id': other_owner, 'user_id': ObjectId(),
+          'datetime': slot, 'party_size': 2, 'status': 'confirmed'}])
+
+    response = test_client.get('/api/reservations/export', headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.is_streamed
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row['party_size'] for row in rows] == ['1', '2', '3']
+    assert {row['restaurant_name'] for row in rows} == {'Mine'}
+
+    response = test_client.get('/api/reservations/export?format=ndjson', headers=headers)
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['restaurant_id'] for line in lines] == [str(mine)] * 3
+
+    assert test_client.get('/api/reservations/export?format=xml', headers=headers).status_code == 400
+
+def test_owner_feed_uses_backfilled_owner_id(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    headers = get_auth_headers(test_client, 'test_restaurant owner@example.com', 'testpass123')
+    mine = create_test_restaurant(mongo, owner_id)
+    theirs = create_test_restaurant(mongo, str(ObjectId()))
+    slot = tomorrow_at(18)
+    # Legacy reservations predate the denormalized owner_id
+    mongo.db.reservations.insert_many([
+        {'restaurant_id': restaurant_id, 'user_id': ObjectId(), 'datetime': slot,
+         'party_size': 2, 'status': 'confirmed'}
+        for restaurant_id in (mine, theirs)
+    ])
+    assert test_client.get('/api/reservations', headers=headers).json['data'] == []
+
+    result = app.test_cli_runner().invoke(args=['backfill-reservation-owners'])
+    assert result.exit_code == 0
+    feed = test_client.get('/api/reservations', headers=headers).json['data']
+    assert [reservation['restaurant_id']['$oid'] for reservation in feed] == [str(mine)]
+
+def test_facets_reused_across_pages(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    for name, cuisine in [('A', 'Italian'), ('B', 'Italian'), ('C', 'Thai')]:
+        create_test_restaurant(mongo, owner_id, name=name, cuisine=cuisine)
+
+    response = test_client.get('/api/restaurants?facets=true&per_page=2&page=1')
+    assert response.status_code == 200
+    assert [doc['name'] for doc in response.json['data']] == ['A', 'B']
+    assert response.json['total'] == 3
+    cuisines = {row['value']: row['count'] for row in response.json['facets']['cuisine']}
+    assert cuisines == {'Italian': 2, 'Thai': 1}
+
+    # Later pages of the same filter reuse the cached counts instead of re-aggregating
+    create_test_restaurant(mongo, owner_id, name='D', cuisine='Italian')
+    response = test_client.get('/api/restaurants?facets=true&per_page=2&page=2')
+    assert [doc['name'] for doc in response.json['data']] == ['C', 'D']
+    assert response.json['facets']['cuisine'] == [{'value': 'Italian', 'count': 2}, {'value': 'Thai', 'count': 1}]
+
+    # A different filter gets its own counts
+    response = test_client.get('/api/restaurants?facets=true&cuisine=thai')
+    assert response.json['facets']['cuisine'] == [{'value': 'Thai', 'count': 1}]
+
+def test_list_projection_and_fields(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    create_test_restaurant(mongo, owner_id, admin_notes='internal', rating_avg=4.0, rating_count=3)
+
+    summary = test_client.get('/api/restaurants').json['data'][0]
+    assert set(summary) <= {'_id', *main.RESTAURANT_SUMMARY_FIELDS}
+    assert 'opening_hours' not in summary
+
+    picked = test_client.get('/api/restaurants?fields=name,city').json['data'][0]
+    assert set(picked) == {'_id', 'name', 'city'}
+
+    full = test_client.get('/api/restaurants?view=full').json['data'][0]
+    assert 'opening_hours' in full
+    assert 'admin_notes' not in full
+
+    response = test_client.get('/api/restaurants?fields=name,password')
+    assert response.status_code == 400
+    assert 'password' in response.json['error']
+
+    # Sorting on a field the projection leaves out still yields a cursor
+    response = test_client.get('/api/restaurants?fields=name&sort=rating&per_page=1&cursor=')
+    assert response.status_code == 200
+
+def test_rating_aggregates_follow_reviews(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    create_test_user(mongo)
+    headers = get_auth_headers(test_client, 'test_customer@example.com', 'testpass123')
+    rated = create_test_restaurant(mongo, owner_id, name='Rated')
+    create_test_restaurant(mongo, owner_id, name='Unrated')
+    aggregates = lambda: mongo.db.restaurants.find_one({'_id': rated})
+
+    review_ids = []
+    for rating in (5, 4):
+        response = test_client.post('/api/reviews', headers=headers, json={
+            'restaurant_id': str(rated), 'rating': rating, 'comment': 'Lovely'
+        })
+        assert response.status_code == 201
+        review_ids.append(response.json['id'])
+    doc = aggregates()
+    assert (doc['rating_count'], doc['rating_sum'], doc['rating_avg']) == (2, 9, 4.5)
+    assert doc['rating_histogram'] == {'5': 1, '4': 1}
+
+    # Unrated restaurants drop out of rating order
+    names = [r['name'] for r in test_client.get('/api/restaurants?sort=rating').json['data']]
+    assert names == ['Rated']
+
+    test_client.delete(f'/api/reviews/{review_ids[0]}', headers=headers)
+    doc = aggregates()
+    assert (doc['rating_count'], doc['rating_avg']) == (1, 4.0)
+
+def test_restaurant_bundle_shape(test_client, mongo):
+    owner_id = create_test_user(mongo, 'Restaurant Owner')
+    restaurant_id = create_test_restaurant(mongo, owner_id, admin_notes='internal')
+    mongo.db.menu_items.insert_one({'restaurant_id': restaurant_id, 'name': 'Soup',
+                                    'price': 5.0, 'category': 'Starters'})
+    mongo.db.reviews.insert_many([
+        {'restaurant_id': restaurant_id, 'user_id': ObjectId(), 'rating': 4,
+         'comment': f'Visit {i}', 'created_at': datetime.utcnow() - timedelta(minutes=i)}
+        for i in range(3)
+    ])
+    day = tomorrow_at(18).date().isoformat()
+
+    response = test_client.get(f'/api/restaurants/{restaurant_id}/bundle?date={day}&per_page=2')
+    assert response.status_code == 200
+    assert 'ETag' in response.headers
+    bundle = response.json
+    assert set(bundle) == {'restaurant', 'menu', 'reviews', 'availability'}
+    assert 'admin_notes' not in bundle['restaurant']
+    assert [item['name'] for item in bundle['menu']] == ['Soup']
+    assert [review['comment'] for review in bundle['reviews']['data']] == ['Visit 0', 'Visit 1']
+    assert bundle['reviews']['pagination']['has_more']
+    assert set(bundle['reviews']['summary']) == {'rating_avg', 'rating_count', 'rating_histogram'}
+    assert bundle['availability']['date'] == day
+    assert len(bundle['availability']['slots']) == 4
+    assert bundle['availability']['available_slots'] == [slot['start'] for slot in bundle['availability']['slots']]
+
+    # Following the reviews cursor continues where the bundle stopped
+    cursor = bundle['reviews']['pagination']['next_cursor']
+    rest = test_client.get(f'/api/reviews?restaurant_id={restaurant_id}&per_page=2&cursor={cursor}').json
+    assert [review['comment'] for review in rest['data']] == ['Visit 2']
+
+    pending_id = create_test_restaurant(mongo, owner_id, status='pending')
+    assert test_client.get(f'/api/restaurants/{pending_id}/bundle').status_code == 404
+
 if __name__ == "__main__":
     pytest.main(["-v", "tests/test_closetable.py"])
\ No newline at end of file